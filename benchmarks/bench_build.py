@@ -0,0 +1,79 @@
+"""Benchmarks building configuration values from their sources.
+
+Run with ``python benchmarks/bench_build.py``. For configuration files of
+growing numbers of leaf values, given both as nested mappings and as
+SEP-joined keys, measures the time and the peak memory allocation of
+merging defaults, the configuration file and environment variables into a
+new configuration trie - both alone ("build") and together with reading
+and parsing the configuration file ("reload"). Both should grow linearly
+with the number of leaves.
+"""
+
+import os
+import json
+import timeit
+import tempfile
+import tracemalloc
+
+from birch import Birch
+
+
+NSPACE = 'birchbuildbench'
+NUMBER = 5
+NUM_LEAVES = [1000, 10000, 100000]
+
+
+def _val_dict(num_leaves):
+    # half of all values are nested, and half are under SEP-joined keys
+    num_sections = num_leaves // 20
+    val_dict = {
+        'section{}'.format(i): {'key{}'.format(j): j for j in range(10)}
+        for i in range(num_sections)
+    }
+    val_dict.update({
+        'flat{}__key{}'.format(i, j): j
+        for i in range(num_sections) for j in range(10)
+    })
+    return val_dict
+
+
+def _peak_allocation(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    os.environ['{}__SECTION0__KEY0'.format(NSPACE.upper())] = 'env'
+    print('{:>8} {:>8} {:>12} {:>12} {:>10} {:>10}'.format(
+        'leaves', 'op', 'ms', 'us/leaf', 'peak MB', 'B/leaf'))
+    for num_leaves in NUM_LEAVES:
+        with tempfile.TemporaryDirectory() as dpath:
+            with open(os.path.join(dpath, 'cfg.json'), 'w') as cfile:
+                json.dump(_val_dict(num_leaves), cfile)
+            cfg = Birch(
+                NSPACE, directories=[dpath], defaults={'section0__key1': 1})
+            assert len(cfg) == num_leaves
+
+            # reloading only environment variables reuses the parsed file,
+            # so that only building is measured
+            cases = [
+                ('build', lambda: cfg.reload(sources='env')),
+                ('reload', cfg.reload),
+            ]
+            for name, func in cases:
+                seconds = timeit.timeit(func, number=NUMBER) / NUMBER
+                peak = _peak_allocation(func)
+                print((
+                    '{:>8} {:>8} {:>12.2f} {:>12.3f} {:>10.2f} {:>10.1f}'
+                ).format(
+                    num_leaves, name, seconds * 1e3,
+                    seconds * 1e6 / num_leaves, peak / 2 ** 20,
+                    peak / num_leaves))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Benchmarks the import time of birch, using ``python -X importtime``.
+
+Run with ``python benchmarks/bench_import.py``. Each measurement imports
+birch in a fresh interpreter, and the median cumulative import time of
+birch, and of the slowest modules it imports, is reported.
+"""
+
+import sys
+import statistics
+import subprocess
+
+
+NUM_RUNS = 15
+NUM_TOP_MODULES = 10
+
+
+def _import_times():
+    """Returns a dict of module names to cumulative import time in us."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import birch'],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    runs = [_import_times() for _ in range(NUM_RUNS)]
+    medians = {
+        name: statistics.median(run.get(name, 0) for run in runs)
+        for name in runs[0]
+    }
+    print('import birch: {:.2f} ms (median of {} runs)'.format(
+        medians['birch'] / 1000, NUM_RUNS))
+    print('slowest imported modules (cumulative):')
+    top_modules = sorted(medians.items(), key=lambda item: -item[1])
+    for name, micros in top_modules[1:NUM_TOP_MODULES + 1]:
+        print('  {:<30} {:8.2f} ms'.format(name, micros / 1000))
+    for name in ('yaml', 'asyncio', 'ctypes'):
+        if name in medians:
+            print('WARNING: {} is imported by import birch!'.format(name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmarks reading large JSON configuration files with JSON backends.
+
+Run with ``python benchmarks/bench_json.py``. Compares the standard json
+module - used by default - with every installed package of
+birch.deserializers.JSON_BACKENDS, which use_fast_json opts into, and with
+json.load over a text file object, as birch used to read JSON files, on
+generated feature-flag tables of several megabytes.
+"""
+
+import os
+import json
+import timeit
+import tempfile
+import importlib
+
+from birch.deserializers import JSON_BACKENDS, _read_file_bytes
+
+
+NUMBER = 5
+NUM_FLAGS = [10000, 100000]
+
+
+def _val_dict(num_flags):
+    return {
+        'features': {
+            'feature_{}'.format(i): {
+                'enabled': i % 3 == 0,
+                'rollout': (i % 100) / 100,
+                'owner': 'team{}'.format(i % 17),
+                'variants': ['control', 'treatment{}'.format(i % 4)],
+            }
+            for i in range(num_flags)
+        }
+    }
+
+
+def _report(size_mb, name, func):
+    seconds = timeit.timeit(func, number=NUMBER) / NUMBER
+    print('{:6.1f} MB  {:<18} {:9.2f} ms'.format(
+        size_mb, name, seconds * 1000))
+
+
+def main():
+    for num_flags in NUM_FLAGS:
+        with tempfile.TemporaryDirectory() as dpath:
+            fpath = os.path.join(dpath, 'cfg.json')
+            with open(fpath, 'w') as cfile:
+                json.dump(_val_dict(num_flags), cfile)
+            size_mb = os.path.getsize(fpath) / 1024 ** 2
+
+            def text_load():
+                with open(fpath, 'r') as cfile:
+                    json.load(cfile)
+            _report(size_mb, 'json.load (text)', text_load)
+            for name in ['json'] + JSON_BACKENDS:
+                try:
+                    loads = importlib.import_module(name).loads
+                except ImportError:
+                    continue
+                _report(
+                    size_mb, '{}.loads'.format(name),
+                    lambda: loads(_read_file_bytes(fpath)),
+                )
+
+
+if __name__ == '__main__':
+    main()
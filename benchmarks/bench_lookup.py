@@ -0,0 +1,47 @@
+"""Benchmarks configuration value lookups of birch.
+
+Run with ``python benchmarks/bench_lookup.py``.
+"""
+
+import os
+import timeit
+
+from birch import Birch
+
+
+NSPACE = 'birchbench'
+NUM_KEYS = 300
+NUMBER = 100000
+
+
+def _setup():
+    for i in range(NUM_KEYS):
+        envar = '{}__SECTION{}__KEY{}'.format(NSPACE.upper(), i % 10, i)
+        os.environ[envar] = str(i)
+    return Birch(NSPACE)
+
+
+def main():
+    cfg = _setup()
+    keys = [
+        'section{}__key{}'.format(i % 10, i) for i in range(0, NUM_KEYS, 10)]
+    handle = cfg.handle(keys[7], caster=int)
+    cases = [
+        ('cfg[key]', lambda: cfg[keys[7]]),
+        ('cfg[NAMESPACE__KEY]', lambda: cfg[NSPACE + '__' + keys[7]]),
+        ('cfg.get(key)', lambda: cfg.get(keys[7])),
+        ('cfg.get(missing, default)', lambda: cfg.get('nokey', 3)),
+        ('key in cfg', lambda: keys[7] in cfg),
+        ('handle.value', lambda: handle.value),
+    ]
+    for name, func in cases:
+        seconds = timeit.timeit(func, number=NUMBER)
+        print('{:<30} {:8.3f} us'.format(name, seconds / NUMBER * 1e6))
+    info = cfg.key_cache_info()
+    print('key cache hit rate: {:.4f} ({} hits, {} misses, {} keys)'.format(
+        info.hits / (info.hits + info.misses), info.hits, info.misses,
+        info.currsize))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmarks reading large YAML configuration files with PyYAML loaders.
+
+Run with ``python benchmarks/bench_yaml.py``. Compares the pure-Python
+yaml.SafeLoader with the libyaml-based yaml.CSafeLoader - which birch uses
+when available - on generated configuration files of realistic structure,
+both for parsing alone and for loading a Birch object.
+"""
+
+import os
+import timeit
+import tempfile
+
+import yaml
+
+from birch import Birch
+from birch.deserializers import yaml_loader
+
+
+NSPACE = 'birchyamlbench'
+NUMBER = 5
+NUM_SECTIONS = [10, 100, 400]
+
+
+def _val_dict(num_sections):
+    return {
+        'service{}'.format(i): {
+            'host': 'service{}.internal.example.com'.format(i),
+            'port': 8000 + i,
+            'enabled': i % 2 == 0,
+            'timeout': 2.5,
+            'retries': {'max': 5, 'backoff': 0.5},
+            'tags': ['tag{}'.format(j) for j in range(5)],
+            'flags': {'flag{}'.format(j): j % 3 == 0 for j in range(20)},
+        }
+        for i in range(num_sections)
+    }
+
+
+def main():
+    print('loader in use by birch: {}'.format(yaml_loader().__name__))
+    loaders = [yaml.SafeLoader]
+    if getattr(yaml, 'CSafeLoader', None) is not None:
+        loaders.append(yaml.CSafeLoader)
+    for num_sections in NUM_SECTIONS:
+        with tempfile.TemporaryDirectory() as dpath:
+            fpath = os.path.join(dpath, 'cfg.yml')
+            with open(fpath, 'w') as cfile:
+                yaml.dump(_val_dict(num_sections), cfile)
+            size_kb = os.path.getsize(fpath) / 1024
+            for loader in loaders:
+                def parse():
+                    with open(fpath, 'r') as cfile:
+                        yaml.load(cfile, Loader=loader)
+                seconds = timeit.timeit(parse, number=NUMBER) / NUMBER
+                print('{:7.1f} KB  {:<12} parse {:9.2f} ms'.format(
+                    size_kb, loader.__name__, seconds * 1000))
+
+            def load_birch():
+                Birch(NSPACE, directories=[dpath], supported_formats='yaml')
+            seconds = timeit.timeit(load_birch, number=NUMBER) / NUMBER
+            print('{:7.1f} KB  {:<12} Birch {:9.2f} ms'.format(
+                size_kb, yaml_loader().__name__, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@
 from .core import Birch  # noqa: F401
 import birch.exceptions as exceptions  # noqa: F401
 import birch.casters as casters  # noqa: F401
+import birch.policies as policies  # noqa: F401
+import birch.deserializers as deserializers  # noqa: F401
 
 from ._version import get_versions
 __version__ = get_versions()['version']
@@ -0,0 +1,112 @@
+"""Persistent caching of parsed configuration files for birch.
+
+Modules used for caching are imported only when caching is used, as this
+module is imported by birch whether caching is used or not.
+"""
+
+import os
+
+from .paths import _RACY_MTIME_WINDOW
+
+
+# bump whenever the structure of cached configuration layers changes
+_CACHE_FORMAT_VERSION = 5
+
+
+def _layer_cache_fpath(cache_dpath, cfg_fpaths):
+    """Returns the path of the cache file for a list of cfg file paths."""
+    import hashlib
+    digest = hashlib.sha1(
+        '\0'.join(cfg_fpaths).encode('utf-8', 'surrogateescape')
+    ).hexdigest()
+    return os.path.join(cache_dpath, 'layers-{}.pickle'.format(digest[:16]))
+
+
+def _cacheable(fingerprint, read_time):
+    """Returns whether a layer read from a file can be cached.
+
+    A file modified this close to the time it was read might be modified
+    again without changing its fingerprint, on file systems with coarse mtime
+    granularity, so layers of such files are not cached.
+
+    Parameters
+    ----------
+    fingerprint : tuple
+        The (mtime_ns, size, inode) fingerprint of the file.
+    read_time : float
+        The time the file was read at, in seconds since the epoch.
+    """
+    return read_time - fingerprint[0] / 1e9 > _RACY_MTIME_WINDOW
+
+
+def _trusted(cfile):
+    """Returns whether an open cache file can be safely unpickled.
+
+    Unpickling can execute arbitrary code, so only files owned by the current
+    user, and writable by no one else, are trusted.
+    """
+    import stat
+    if not hasattr(os, 'getuid'):  # pragma: no cover
+        return True
+    fstat = os.fstat(cfile.fileno())
+    return fstat.st_uid == os.getuid() and not (
+        fstat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _load_layer_cache(fpath):
+    """Loads cached configuration file layers.
+
+    Returns
+    -------
+    dict of str to tuple
+        A mapping of configuration file paths to (fingerprint, layer) tuples.
+        If the cache file is missing, unreadable, of an older format or not
+        trusted - see _trusted - an empty dict is returned.
+    """
+    import pickle
+    try:
+        with open(fpath, 'rb') as cfile:
+            if not _trusted(cfile):
+                return {}
+            version, layers = pickle.load(cfile)
+    except Exception:
+        return {}
+    if version != _CACHE_FORMAT_VERSION:
+        return {}
+    return layers
+
+
+def _dump_layer_cache(fpath, layers):
+    """Atomically writes configuration file layers to a cache file.
+
+    Failing to write the cache is silently ignored, as caching is only an
+    optimization.
+
+    Parameters
+    ----------
+    fpath : str
+        The path of the cache file to write.
+    layers : dict of str to tuple
+        A mapping of configuration file paths to (fingerprint, layer) tuples.
+    """
+    import pickle
+    import tempfile
+    dpath = os.path.dirname(fpath)
+    try:
+        # the cache directory is accessible only by the user
+        os.makedirs(dpath, mode=0o700, exist_ok=True)
+        # files created by mkstemp are readable and writable only by the user
+        fd, tmp_fpath = tempfile.mkstemp(
+            dir=dpath, prefix='.layers-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as cfile:
+                pickle.dump(
+                    (_CACHE_FORMAT_VERSION, layers), cfile,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_fpath, fpath)
+        except BaseException:
+            os.remove(tmp_fpath)
+            raise
+    except Exception:  # pragma: no cover
+        pass
@@ -2,27 +2,411 @@
 
 import os
 import re
-import json
-import pprint
+import time
+import weakref
+import functools
 import warnings
+import threading
 import collections
 
-from strct.dicts import (
-    safe_nested_val,
-    put_nested_val,
-    key_tuple_value_nested_generator,
-    CaseInsensitiveDict,
-)
+from strct.dicts import key_tuple_value_nested_generator
 
 from .exceptions import UnsupporedFormatException
+from .watch import _watch_fpaths
+from .deserializers import _deserializer, _read_file_bytes
+from .env import _register_envar_prefix, _envar_items
+from .trie import (
+    SEP,
+    _build_trie,
+    _get_path,
+    _count_leaves,
+    _freeze_values,
+)
+from .cache import (
+    _cacheable,
+    _layer_cache_fpath,
+    _load_layer_cache,
+    _dump_layer_cache,
+)
+from .policies import (
+    ReloadPolicy,
+    OnAccessReload,
+    ThrottledReload,
+)
 from .paths import (
     _xdg_cfg_dpath,
     _xdg_cache_dpath,
     _legacy_cfg_dpath,
+    _fpath_fingerprints,
 )
 
 
-SEP = '__'
+def _key_normalizer(upper_namespace, cache_size):
+    """Returns a memoized function normalizing keys of the given namespace.
+
+    Keys are normalized into the path they are stored under in configuration
+    tries, by lower-casing them, removing any namespace prefix and splitting
+    them by SEP; e.g. 'server__port', 'zubat_SERVER__port' and
+    'ZUBAT__SERVER__PORT' are all normalized to ('server', 'port').
+    """
+    root1 = upper_namespace.lower() + '_'
+    root2 = upper_namespace.lower() + '__'
+    root_len1 = len(root1)
+    root_len2 = len(root2)
+
+    @functools.lru_cache(maxsize=cache_size)
+    def normalize_key(key):
+        try:
+            key = key.lower()
+        except AttributeError:
+            raise ValueError((
+                "Birch does not support non-string keys! "
+                "{} provided as key!".format(key)
+            ))
+        if key.startswith(root2):
+            key = key[root_len2:]
+        elif key.startswith(root1):
+            key = key[root_len1:]
+        return tuple(key.split(SEP))
+
+    return normalize_key
+
+
+def _normalized(normalize_key, key):
+    """Returns the normalized form of a key, using a key normalizer."""
+    try:
+        return normalize_key(key)
+    except TypeError:
+        # unhashable keys can't be memoized
+        raise ValueError((
+            "Birch does not support non-string keys! "
+            "{} provided as key!".format(key)
+        ))
+
+
+def _hashable_arg(arg):
+    """Returns a hashable equivalent of a constructor argument.
+
+    Dicts, lists, tuples and sets are converted recursively, with lists and
+    tuples considered equivalent. Other objects are paired with their type, so
+    that equal objects of different types - like True, 1 and 1.0 - are not
+    considered equivalent.
+    """
+    if isinstance(arg, dict):
+        return (dict, frozenset(
+            (_hashable_arg(key), _hashable_arg(value))
+            for key, value in arg.items()
+        ))
+    if isinstance(arg, (list, tuple)):
+        return (tuple, tuple(_hashable_arg(item) for item in arg))
+    if isinstance(arg, (set, frozenset)):
+        return (frozenset, frozenset(_hashable_arg(item) for item in arg))
+    return (type(arg), arg)
+
+
+class _FailedCast(object):
+    """Marks a value its default caster failed to cast."""
+
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        self.message = message
+
+
+class _LeafKeysView(collections.abc.KeysView):
+    """A view of the keys of all values in a snapshot, joined by SEP."""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        for key_tuple, _ in key_tuple_value_nested_generator(
+                self._mapping._val_dict):
+            yield SEP.join(key_tuple)
+
+
+class _LeafItemsView(collections.abc.ItemsView):
+    """A view of the (key, value) pairs of all values in a snapshot."""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        return self._mapping._leaf_items()
+
+
+class _LeafValuesView(collections.abc.ValuesView):
+    """A view of all values in a snapshot."""
+
+    __slots__ = ()
+
+    def __contains__(self, value):
+        for val in self:
+            if val is value or val == value:
+                return True
+        return False
+
+    def __iter__(self):
+        for _, val in self._mapping._leaf_items():
+            yield val
+
+
+class Snapshot(collections.abc.Mapping):
+    """A consistent, read-only generation of configuration values.
+
+    Snapshots are returned by the snapshot() method of Birch objects, and
+    support the same value access methods. Every reload of configuration
+    values builds a new snapshot, which is then published by a single
+    reference swap, while existing snapshots never change. A snapshot can
+    thus be held and read by any number of threads without locks or copies,
+    and all values read from it are of the same generation, even if
+    configuration is reloaded meanwhile. Nested mappings - like
+    snapshot['server'] - are read-only dicts, and lists are read-only lists.
+
+    Example
+    -------
+    >>> import os; os.environ['ZUBAT__RETRIES'] = '3'
+    >>> zubat_cfg = Birch('zubat')
+    >>> snapshot = zubat_cfg.snapshot()
+    >>> os.environ['ZUBAT__RETRIES'] = '5'
+    >>> zubat_cfg.reload()
+    >>> snapshot['retries'], zubat_cfg['retries']
+    ('3', '5')
+    """
+
+    __slots__ = (
+        'namespace', '_val_dict', '_resolved', '_len', '_normalize_key',
+        '_no_val',
+    )
+
+    def __init__(self, cfg, val_dict, resolved):
+        self.namespace = cfg.namespace
+        # the trie of all configuration values
+        self._val_dict = val_dict
+        # a memo mapping key paths to resolved values, initially holding the
+        # casted form of every value with a default caster - or a _FailedCast
+        # object, if casting failed - and populated with other values as
+        # their key paths are looked up, so only keys actually used are held
+        self._resolved = resolved
+        # snapshots never change, so their values are counted only once
+        self._len = _count_leaves(val_dict)
+        self._normalize_key = cfg._normalize_key
+        self._no_val = cfg._no_val
+
+    def _missing_key_error(self, key):
+        return KeyError("{}: No configuration value for {}.".format(
+            self.namespace,
+            SEP.join(_normalized(self._normalize_key, key)).upper(),
+        ))
+
+    def _lookup_path(self, key_tuple):
+        """Returns the value of a key path, with default casters applied.
+
+        If no value is found, the self._no_val object is returned.
+        """
+        val = self._resolved.get(key_tuple, self._no_val)
+        if val is self._no_val:
+            val = _get_path(self._val_dict, key_tuple, self._no_val)
+            # only found paths are memoized, so the memo never outgrows the
+            # trie, whatever keys are looked up
+            if val is not self._no_val:
+                self._resolved[key_tuple] = val
+        elif val.__class__ is _FailedCast:
+            raise ValueError(val.message)
+        return val
+
+    def _cast(self, val, caster):
+        try:
+            return caster(val)
+        except ValueError:
+            raise ValueError(
+                f"{self.namespace}: Bad configuration value {val} failed "
+                f"to be casted with caster {caster}."
+            )
+
+    # implementing a collections.abc.Mapping abstract method
+    def __getitem__(self, key):
+        val = self._lookup_path(_normalized(self._normalize_key, key))
+        if val is self._no_val:
+            raise self._missing_key_error(key)
+        return val
+
+    # overriding the collections.abc.Mapping implementation, which raises and
+    # catches a KeyError on misses, and applies default casters
+    def __contains__(self, key):
+        key_tuple = _normalized(self._normalize_key, key)
+        return key_tuple in self._resolved or _get_path(
+            self._val_dict, key_tuple, self._no_val) is not self._no_val
+
+    def mget(self, key, caster=None):
+        """Return the value for key if it's in the configuration.
+
+        See Birch.mget for a description of all parameters.
+        """
+        val = self[key]
+        if caster:
+            return self._cast(val, caster)
+        return val
+
+    def _lookup_many(self, keys, defaults, casters, throw, as_dict):
+        if defaults is None:
+            defaults = {}
+        if casters is None:
+            casters = {}
+        vals = []
+        for key in keys:
+            val = self._lookup_path(_normalized(self._normalize_key, key))
+            if val is self._no_val:
+                if throw:
+                    raise self._missing_key_error(key)
+                val = defaults.get(key)
+            else:
+                caster = casters.get(key)
+                if caster:
+                    val = self._cast(val, caster)
+            vals.append(val)
+        if as_dict:
+            return dict(zip(keys, vals))
+        return tuple(vals)
+
+    def mget_many(self, keys, casters=None, as_dict=False):
+        """Return the values of all given keys.
+
+        See Birch.mget_many for a description of all parameters.
+        """
+        keys = list(keys)
+        return self._lookup_many(
+            keys, defaults=None, casters=casters, throw=True, as_dict=as_dict)
+
+    def get_many(self, keys, defaults=None, casters=None, as_dict=False):
+        """Return the values of all given keys, or defaults if not found.
+
+        See Birch.get_many for a description of all parameters.
+        """
+        keys = list(keys)
+        return self._lookup_many(
+            keys, defaults=defaults, casters=casters, throw=False,
+            as_dict=as_dict)
+
+    def get(self, key, default=None, caster=None, throw=False, warn=False):
+        """Return the value for key if it's in the configuration, else default.
+
+        See Birch.get for a description of all parameters.
+        """
+        val = self._lookup_path(_normalized(self._normalize_key, key))
+        if val is self._no_val:
+            if default is None:
+                if throw:
+                    raise self._missing_key_error(key)
+                if warn:
+                    warnings.warn((
+                        "None or no value was provided to configuration value "
+                        "{} for {}!").format(
+                            key, self.namespace))
+            return default
+        if caster:
+            return self._cast(val, caster)
+        return val
+
+    # implementing a collections.abc.mapping abstract method
+    def __len__(self):
+        return self._len
+
+    # implementing a collections.abc.mapping abstract method
+    def __iter__(self):
+        for keytupl, value in key_tuple_value_nested_generator(self._val_dict):
+            yield SEP.join(keytupl), value
+
+    def _leaf_items(self):
+        """Yields the (key, value) pairs of all values, keys joined by SEP.
+
+        Values are given as __getitem__ returns them; i.e. with default
+        casters applied.
+        """
+        resolved = self._resolved
+        for key_tuple, val in key_tuple_value_nested_generator(
+                self._val_dict):
+            val = resolved.get(key_tuple, val)
+            if val.__class__ is _FailedCast:
+                raise ValueError(val.message)
+            yield SEP.join(key_tuple), val
+
+    # overriding the collections.abc.Mapping implementations of the following
+    # three methods, as __iter__ yields (key, value) pairs rather than keys
+    def keys(self):
+        """Returns a view of the keys of all values, joined by '__'."""
+        return _LeafKeysView(self)
+
+    def items(self):
+        """Returns a view of the (key, value) pairs of all values."""
+        return _LeafItemsView(self)
+
+    def values(self):
+        """Returns a view of all values."""
+        return _LeafValuesView(self)
+
+    def as_str(self):
+        """Returns a string representation of the configuration values dict.
+
+        Returns
+        -------
+        repr : str
+            A string representation of the configuration values dict.
+        """
+        import pprint
+        return pprint.pformat(self._val_dict, indent=2)
+
+
+class KeyHandle(object):
+    """A handle to the value of a single configuration key.
+
+    Handles are returned by the handle() method of Birch objects. The key of
+    a handle is normalized once, on creation, and its value is resolved -
+    and casted - once per configuration snapshot, so that repeatedly reading
+    the value of a handle is cheap. The value is refreshed automatically
+    whenever configuration is reloaded.
+
+    Example
+    -------
+    >>> import os; os.environ['ZUBAT__PORT'] = '555'
+    >>> zubat_cfg = Birch('zubat')
+    >>> port = zubat_cfg.handle('port', caster=int, default=8888)
+    >>> port.value
+    555
+    >>> port()
+    555
+    """
+
+    __slots__ = ('_cfg', '_key', '_caster', '_default', '_cached')
+
+    def __init__(self, cfg, key, caster=None, default=None):
+        self._cfg = cfg
+        self._key = _normalized(cfg._normalize_key, key)
+        self._caster = caster
+        self._default = default
+        # a (snapshot, value) tuple, swapped atomically
+        self._cached = (None, None)
+
+    @property
+    def value(self):
+        """The value of the handle's key, or its default if not found."""
+        cfg = self._cfg
+        if cfg._on_access is not None:
+            cfg._on_access()
+        snapshot = cfg._snapshot
+        if snapshot is None:
+            snapshot = cfg._current_snapshot()
+        cached = self._cached
+        if cached[0] is snapshot:
+            return cached[1]
+        val = snapshot._lookup_path(self._key)
+        if val is cfg._no_val:
+            val = self._default
+        elif self._caster:
+            val = snapshot._cast(val, self._caster)
+        self._cached = (snapshot, val)
+        return val
+
+    def __call__(self):
+        return self.value
 
 
 class Birch(collections.abc.Mapping):
@@ -44,11 +428,21 @@ class Birch(collections.abc.Mapping):
         allowed directories are used to consturct the configuration tree, in
         an undefined order. By default, the first such file encountered is
         read.
-    auto_reload : bool, default False
-        If set to true, the reload() method is automatically called first
-        at the start of every get() or __getitem__() call (also when using the
-        obj[key] syntax). This ensures every configuration value retrieved is
+    auto_reload : bool, float or birch.policies.ReloadPolicy, default False
+        If set to true, configuration sources are checked for changes at the
+        start of every get() or __getitem__() call (also when using the
+        obj[key] syntax), and the configuration is reloaded if any of them
+        changed. This ensures every configuration value retrieved is
         up-to-date to all configuration sources (both files and env variables).
+        Changes are detected using a cheap fingerprint of each source - the
+        modification time, size and inode of configuration files, and the
+        set of namespace-prefixed environment variables - so no file is read
+        or parsed unless it has changed. If a number is given, changed
+        sources are reloaded on value access at most once every that many
+        seconds. Alternatively, a policy object from ``birch.policies`` can
+        be given to determine how configuration is reloaded; e.g.
+        ``BackgroundReload(interval=5)`` reloads changed sources every 5
+        seconds in the background, never blocking value access.
     defaults : dict of str to object, optional
         A dictionary of default values for any number of keys or nested keys.
         Nested keys can be given as either __-separated key sequences or nested
@@ -68,36 +462,66 @@ class Birch(collections.abc.Mapping):
         provided to the `caster` keyword of the `get` method will NOT override
         these constructor-provided defaults. Instead, per-call caster functions
         will be applied AFTER any default caster configured.
+    watch : bool, default False
+        If set to true, a background thread watches the paths of all
+        configuration files, and reloads any file as soon as it is created,
+        modified, deleted or atomically replaced. inotify is used on Linux,
+        and file paths are polled every second elsewhere. Since values are
+        kept up-to-date in the background, value access performs no I/O at
+        all. Environment variables are not watched. Call close() to stop
+        watching.
+    cache : bool, default False
+        If set to true, parsed configuration files are cached in a binary
+        file under the XDG-compliant cache directory of the namespace (see
+        xdg_cache_dpath()), together with the modification time, size and
+        inode of each file. Files that did not change since they were cached
+        are then not parsed again, also by later processes, greatly reducing
+        the startup time of short-lived processes reading large files.
+        Environment variables are never cached.
+    lazy : bool, optional
+        If set to true, no configuration source is read - and no file is even
+        looked for - until a configuration value is first accessed, so that
+        Birch objects created on import time but never used cost nothing.
+        First access is thread-safe. If not given, the value of the
+        ``Birch.lazy_by_default`` class attribute, False by default, is used.
+    prefetch : bool, default False
+        If set to true, configuration values are loaded on a background
+        thread started on construction, rather than on the constructing
+        thread, overlapping file reading and parsing with whatever the
+        application does next - e.g. importing other modules. If values are
+        accessed before loading is done, access waits for it to finish.
+    key_cache_size : int, default 1024
+        The maximal number of distinct keys for which the normalized form -
+        lower-cased, with any namespace prefix removed, and split by '__'
+        into a key path - is memoized, with least-recently-used keys evicted
+        first. Use key_cache_info() to
+        inspect hit rates. If set to None, the memo is unbounded.
     """
 
     class _NoVal(object):
         pass
 
+    # used when the lazy constructor parameter is not given
+    lazy_by_default = False
+
+    # argument signature to instance; see the shared() class method
+    _shared_instances = weakref.WeakValueDictionary()
+    _shared_lock = threading.Lock()
+
     _CFG_FNAME_PAT = 'cfg.{}'
-    _EXT_TO_DESERIALIZER_MAP = {
-        '.json': json.load,
-    }
-    _EXT_TO_DESERIALIZER_KWARGS_MAP = {
-        '.json': {},
-    }
+    _ENV_SOURCE = 'env'
+    _FILES_SOURCE = 'files'
+    _WATCH_INTERVAL = 1
     _FMT_TO_EXT_MAP = {
         'json': ['json'],
         'yaml': ['yml', 'yaml'],
     }
 
-    try:
-        import yaml
-        _EXT_TO_DESERIALIZER_MAP['.yml'] = yaml.load
-        _EXT_TO_DESERIALIZER_MAP['.yaml'] = yaml.load
-        yaml_load_kwargs = {'Loader': yaml.SafeLoader}
-        _EXT_TO_DESERIALIZER_KWARGS_MAP['.yml'] = yaml_load_kwargs
-        _EXT_TO_DESERIALIZER_KWARGS_MAP['.yaml'] = yaml_load_kwargs
-    except ImportError:  # pragma: no cover
-        pass
-
     def __init__(
         self, namespace, directories=None, supported_formats=None,
         load_all=False, auto_reload=False, defaults=None, default_casters=None,
+        watch=False, cache=False, lazy=None, prefetch=False,
+        key_cache_size=1024,
     ):
         self._xdg_cfg_dpath = _xdg_cfg_dpath(namespace=namespace)
         if directories is None:
@@ -118,18 +542,182 @@ class Birch(collections.abc.Mapping):
         self._root2 = self._upper_namespace + '__'
         self._root_len1 = len(namespace) + 1
         self._root_len2 = len(namespace) + 2
-        self._envar_pat = r'{}((_|__)[A-Z0-9]+)+'.format(self._upper_namespace)
+        self._normalize_key = _key_normalizer(
+            self._upper_namespace, key_cache_size)
+        self._envar_pat = re.compile(
+            r'{}((_|__)[A-Z0-9]+)+'.format(self._upper_namespace))
+        _register_envar_prefix(self._root1)
         self.directories = directories
         self.formats = supported_formats
         self.load_all = load_all
-        self._auto_reload = auto_reload
+        self._auto_reload = Birch._reload_policy(auto_reload)
         self._no_val = Birch._NoVal()
-        self._defaults = defaults
+        if defaults is not None:
+            # copied into a trie, so later changes to defaults are ignored
+            self._defaults_layer = _build_trie(
+                self._build_defaults_dict(defaults))
+        else:
+            self._defaults_layer = None
         if default_casters:
-            self._default_casters = self._build_defaults_dict(default_casters)
+            self._default_casters = _build_trie(
+                self._build_defaults_dict(default_casters))
+            # key path to default caster
+            self._caster_index = {
+                key_tuple: caster
+                for key_tuple, caster in key_tuple_value_nested_generator(
+                    self._default_casters)
+                if callable(caster)
+            }
         else:
             self._default_casters = None
-        self._val_dict = self._build_val_dict()
+            self._caster_index = {}
+        # source name to parsed configuration layer
+        self._layers = {}
+        # source name to source fingerprint at the time of its last loading
+        self._fingerprints = {}
+        self._cache = cache
+        # cfg file path to (fingerprint, layer); loaded on first use
+        self._layer_cache = None
+        self._layer_cache_dirty = False
+        self._lock = threading.RLock()
+        # a (directories, formats, sources) tuple, replaced whenever the
+        # directories or formats attributes change
+        self._sources_memo = (None, None, None)
+        self._watcher = None
+        # validates supported formats on construction, also if lazy
+        self._sources()
+        self._snapshot = None
+        self._watch_requested = watch
+        if lazy is None:
+            lazy = Birch.lazy_by_default
+        if not (lazy or prefetch):
+            self._load()
+        self._bind_reload_policy()
+        if prefetch:
+            self._prefetch()
+
+    def _bind_reload_policy(self):
+        self._on_access = None
+        if self._auto_reload is not None:
+            self._auto_reload.bind(self)
+            self._on_access = self._auto_reload.on_access
+            weakref.finalize(self, self._auto_reload.close)
+
+    def _load(self):
+        """Loads configuration values for the first time."""
+        self._reload_sources(self._sources())
+        if self._watch_requested:
+            self._watch()
+
+    def _prefetch(self):
+        def load():
+            try:
+                self._current_snapshot()
+            except Exception:  # pragma: no cover
+                # loading is retried, and the error raised, on first access
+                pass
+
+        threading.Thread(
+            target=load, name='birch-prefetch', daemon=True).start()
+
+    def _current_snapshot(self):
+        """Returns the current snapshot, loading the first one if needed."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._load()
+                snapshot = self._snapshot
+        return snapshot
+
+    @staticmethod
+    def _reload_policy(auto_reload):
+        if auto_reload is True:
+            return OnAccessReload()
+        if not auto_reload:
+            return None
+        if isinstance(auto_reload, ReloadPolicy):
+            return auto_reload
+        if isinstance(auto_reload, (int, float)):
+            return ThrottledReload(interval=auto_reload)
+        raise ValueError((
+            "auto_reload must be either a bool, a number or a ReloadPolicy "
+            "object!"))
+
+    @classmethod
+    def shared(cls, namespace, **kwargs):
+        """Returns a Birch object shared by all calls with the same arguments.
+
+        The first call with a given namespace and set of keyword arguments
+        constructs a Birch object, which is returned by all subsequent calls
+        with equal arguments, for as long as it is referenced anywhere in the
+        process. Code in different modules - or different libraries - can
+        thus share a single Birch object, reading and parsing configuration
+        sources once, rather than once per object.
+
+        Parameters
+        ----------
+        namespace : str
+            The namespace for which configuration is loaded.
+        **kwargs
+            Any keyword arguments accepted by the Birch constructor. Values
+            must be hashable, or dicts, lists, tuples or sets of such values.
+            Reload policy objects can't be given as auto_reload, as each can
+            be used by a single Birch object; give True or an interval
+            instead.
+
+        Returns
+        -------
+        Birch
+            The shared Birch object of the given arguments.
+
+        Example
+        -------
+        >>> cfg = Birch.shared('zubat', directories=[])
+        >>> Birch.shared('zubat', directories=[]) is cfg
+        True
+        >>> Birch.shared('zubat', directories=[], lazy=True) is cfg
+        False
+        """
+        if isinstance(kwargs.get('auto_reload'), ReloadPolicy):
+            raise ValueError((
+                "Reload policy objects can't be used by shared Birch objects!"
+                " Use auto_reload=True or an interval, or construct a Birch"
+                " object directly."))
+        signature = (cls, namespace, _hashable_arg(kwargs))
+        with Birch._shared_lock:
+            instance = Birch._shared_instances.get(signature)
+        if instance is not None:
+            return instance
+        # constructed without holding the lock, so that constructing an
+        # object - possibly reading files - never blocks other calls
+        instance = cls(namespace, **kwargs)
+        with Birch._shared_lock:
+            shared_instance = Birch._shared_instances.get(signature)
+            if shared_instance is None:
+                Birch._shared_instances[signature] = instance
+                return instance
+        # another call constructed an object of the same arguments meanwhile
+        instance.close()
+        return shared_instance
+
+    @classmethod
+    def invalidate_shared(cls, namespace=None):
+        """Makes subsequent shared() calls construct new Birch objects.
+
+        Shared objects already returned by shared() are not modified, and can
+        still be used.
+
+        Parameters
+        ----------
+        namespace : str, optional
+            If given, only shared objects of this namespace are invalidated.
+            Otherwise, all shared objects are invalidated.
+        """
+        with Birch._shared_lock:
+            for signature in list(Birch._shared_instances.keys()):
+                if namespace is None or signature[1] == namespace:
+                    Birch._shared_instances.pop(signature, None)
 
     def xdg_cfg_dpath(self):
         """Returns the XDG-compliant configuration home for this namespace.
@@ -151,9 +739,165 @@ class Birch(collections.abc.Mapping):
         """
         return _xdg_cache_dpath(namespace=self.namespace)
 
-    def reload(self):
-        """Reloads configuration values from all sources."""
-        self._val_dict = self._build_val_dict()
+    def reload(self, sources=None):
+        """Reloads configuration values from all sources, or from some of them.
+
+        Parameters
+        ----------
+        sources : str or list of str, optional
+            The configuration sources to reload. Each source is either 'env',
+            for environment variables, 'files', for all configuration files,
+            or the path of a specific configuration file. If not given, all
+            sources are reloaded. Only the given sources are re-read, while
+            values of all other sources are reused when configuration values
+            are merged. Default values never change after construction, and
+            thus are never reloaded.
+        """
+        if sources is not None:
+            sources = self._expand_sources(sources)
+        if self._snapshot is None:
+            # the first load - reading all sources - is done as on first
+            # access, so that it is done once, and file watching is started
+            self._current_snapshot()
+            return
+        if sources is None:
+            sources = self._sources()
+        self._reload_sources(sources)
+
+    def _sources(self):
+        directories, formats, sources = self._sources_memo
+        if directories != self.directories or formats != self.formats:
+            with self._lock:
+                # copied, so that in-place changes are detected too
+                directories = list(self.directories)
+                formats = list(self.formats)
+                sources = self._cfg_fpaths() + [Birch._ENV_SOURCE]
+                self._sources_memo = (directories, formats, sources)
+                if self._watcher is not None:
+                    # the paths of configuration files changed
+                    self._watcher.stop()
+                    self._watch()
+        return sources
+
+    def _expand_sources(self, sources):
+        if isinstance(sources, str):
+            sources = [sources]
+        all_sources = self._sources()
+        expanded = []
+        for source in sources:
+            if source == Birch._FILES_SOURCE:
+                expanded.extend(all_sources[:-1])
+            elif source in all_sources:
+                expanded.append(source)
+            else:
+                raise ValueError((
+                    "{} is not a configuration source of the {} namespace!"
+                ).format(source, self.namespace))
+        return expanded
+
+    def _source_fingerprints(self, sources):
+        fingerprints = _fpath_fingerprints(
+            [source for source in sources if source != Birch._ENV_SOURCE],
+            fname_prefix=Birch._CFG_FNAME_PAT.format(''),
+        )
+        if Birch._ENV_SOURCE in sources:
+            fingerprints[Birch._ENV_SOURCE] = _envar_items(self._root1)
+        return fingerprints
+
+    def _reload_sources(self, sources):
+        with self._lock:
+            # fingerprinted under the lock, so that values built from older
+            # fingerprints never replace values published meanwhile
+            self._publish(self._source_fingerprints(sources))
+
+    def _publish(self, fingerprints):
+        """Builds and publishes values, given fingerprints of changed sources.
+
+        Must be called while holding self._lock.
+        """
+        for source, fingerprint in fingerprints.items():
+            self._fingerprints[source] = fingerprint
+            self._layers.pop(source, None)
+        val_dict = self._build_val_dict()
+        resolved = self._apply_default_casters(val_dict)
+        # published by a single reference swap
+        self._snapshot = Snapshot(self, val_dict, resolved)
+        if self._layer_cache_dirty:
+            self._dump_layer_cache()
+
+    @property
+    def _val_dict(self):
+        return self._current_snapshot()._val_dict
+
+    def _reload_if_changed(self):
+        if self._snapshot is None:
+            # not loaded yet; loaded on first access
+            return
+        # sources are checked without locking, as most checks find no change;
+        # stored fingerprints are copied first, as they may be replaced by
+        # another thread while sources are fingerprinted
+        stored = dict(self._fingerprints)
+        changed = {}
+        for source, fingerprint in self._source_fingerprints(
+                self._sources()).items():
+            # sources added by changing directories or formats are new
+            if fingerprint != stored.get(source, self._no_val):
+                changed[source] = fingerprint
+        if not changed:
+            return
+        with self._lock:
+            # sources reloaded by another thread since they were checked are
+            # skipped, so that the values it published are never replaced by
+            # values built from older fingerprints
+            fingerprints = {
+                source: fingerprint
+                for source, fingerprint in changed.items()
+                if self._fingerprints.get(source, self._no_val) is stored.get(
+                    source, self._no_val)
+            }
+            if fingerprints:
+                self._publish(fingerprints)
+
+    def _watch(self):
+        self_ref = weakref.ref(self)
+
+        def reload_fpaths(fpaths):
+            cfg = self_ref()
+            if cfg is None:  # pragma: no cover
+                return False
+            # once directories or formats change, the watcher is restarted by
+            # _sources(), and paths that are no longer sources are ignored
+            sources = cfg._sources()
+            fpaths = [fpath for fpath in fpaths if fpath in sources]
+            if not fpaths:
+                return True
+            try:
+                cfg.reload(sources=fpaths)
+            except Exception:  # pragma: no cover
+                # a malformed file is reloaded again once it is fixed
+                pass
+            return True
+
+        self._watcher = _watch_fpaths(
+            fpaths=self._sources()[:-1],
+            fingerprints=self._fingerprints,
+            callback=reload_fpaths,
+            interval=Birch._WATCH_INTERVAL,
+        )
+        weakref.finalize(self, self._watcher.stop)
+
+    def close(self):
+        """Stops all background activity of this object.
+
+        This includes file watching and background reloading. Configuration
+        values can still be accessed and reloaded afterwards.
+        """
+        if self._auto_reload is not None:
+            self._auto_reload.close()
+        self._watch_requested = False
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
 
     def _cfg_fpaths(self):
         paths = []
@@ -169,51 +913,37 @@ class Birch(collections.abc.Mapping):
                         "Unsupported format {}".format(fmt))
         return paths
 
-    @staticmethod
-    def _hierarchical_dict_from_dict(dict_obj):
-        val_dict = {}
-        for key, value in dict_obj.items():
-            key = key.lower()
-            if SEP in key:
-                key_tuple = key.split(SEP)
-            else:
-                key_tuple = [key]
-            val_dict[key] = value
-            put_nested_val(val_dict, key_tuple, value)
-        return CaseInsensitiveDict.from_dict(val_dict)
-
     def _read_cfg_file(self, fpath):
         _, ext = os.path.splitext(fpath)
-        try:
-            deserial = Birch._EXT_TO_DESERIALIZER_MAP[ext]
-            deserial_kwargs = Birch._EXT_TO_DESERIALIZER_KWARGS_MAP[ext]
-        except KeyError:  # pragma: no cover
+        deserializer = _deserializer(ext)
+        if deserializer is None:  # pragma: no cover
             return {}
+        loads, loads_kwargs = deserializer
         try:
-            with open(fpath, 'r') as cfile:
-                val_dict = deserial(cfile, **deserial_kwargs)
-            val_dict = Birch._hierarchical_dict_from_dict(val_dict)
-            return val_dict
+            data = _read_file_bytes(fpath)
         except FileNotFoundError:  # pragma: no cover
             return {}
+        # kept as parsed - with container values frozen once, rather than
+        # on every build - and merged directly into the trie of every build
+        return _freeze_values(loads(data, **loads_kwargs))
 
     def _read_env_vars(self):
-        pat = re.compile(self._envar_pat)
         val_dict = {}
-        env_vars = os.environ
-        for envar in env_vars:
-            if re.match(pat, envar):
+        # the fingerprint of the env source holds all variables starting with
+        # the namespace prefix, as they were when it was taken; sorted, so that
+        # variables mapped to the same key override each other consistently
+        for envar, value in sorted(self._fingerprints[Birch._ENV_SOURCE]):
+            if self._envar_pat.match(envar):
                 if self._root2 in envar:
                     key = envar[self._root_len2:]
                 # elif self._root1 in envar:
                 else:
                     key = envar[self._root_len1:]
-                val_dict[key] = env_vars[envar]
-        val_dict = Birch._hierarchical_dict_from_dict(val_dict)
+                val_dict[key] = value
         return val_dict
 
     def _build_defaults_dict(self, defaults):
-        val_dict = CaseInsensitiveDict()
+        val_dict = {}
         for key, value in defaults.items():
             new_key = key
             try:
@@ -228,65 +958,146 @@ class Birch(collections.abc.Mapping):
             elif new_key[:self._root_len1] == self._root1:
                 new_key = new_key[self._root_len1:]
             val_dict[new_key] = value
-        val_dict = Birch._hierarchical_dict_from_dict(val_dict)
         return val_dict
 
+    def _layer(self, source):
+        try:
+            return self._layers[source]
+        except KeyError:
+            pass
+        if source == Birch._ENV_SOURCE:
+            layer = self._read_env_vars()
+        elif self._cache:
+            layer = self._cached_cfg_file_layer(source)
+        else:
+            layer = self._read_cfg_file(source)
+        self._layers[source] = layer
+        return layer
+
+    def _layer_cache_fpath(self):
+        return _layer_cache_fpath(self.xdg_cache_dpath(), self._cfg_fpaths())
+
+    def _cached_cfg_file_layer(self, fpath):
+        if self._layer_cache is None:
+            self._layer_cache = _load_layer_cache(self._layer_cache_fpath())
+        fingerprint = self._fingerprints[fpath]
+        cached = self._layer_cache.get(fpath)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        layer = self._read_cfg_file(fpath)
+        if _cacheable(fingerprint, time.time()):
+            self._layer_cache[fpath] = (fingerprint, layer)
+            self._layer_cache_dirty = True
+        return layer
+
+    def _dump_layer_cache(self):
+        self._layer_cache = {
+            fpath: cached for fpath, cached in self._layer_cache.items()
+            if cached[0] == self._fingerprints.get(fpath)
+        }
+        _dump_layer_cache(self._layer_cache_fpath(), self._layer_cache)
+        self._layer_cache_dirty = False
+
     def _build_val_dict(self):
-        val_dict = CaseInsensitiveDict()
-        if self._defaults is not None:
-            val_dict = self._build_defaults_dict(self._defaults)
-        for path in self._cfg_fpaths():
-            if os.path.isfile(path):
-                val_dict.update(**self._read_cfg_file(path))
+        layers = []
+        if self._defaults_layer is not None:
+            layers.append(self._defaults_layer)
+        for path in self._sources()[:-1]:
+            # sources added since the last reload are read once reloaded
+            if self._fingerprints.get(path) is not None:
+                layers.append(self._layer(path))
                 if not self.load_all:
                     break
-        val_dict.update(**self._read_env_vars())
-        val_dict = Birch._hierarchical_dict_from_dict(val_dict)
-        return val_dict
+        layers.append(self._layer(Birch._ENV_SOURCE))
+        # layers are kept as read, and are streamed into new nodes in a
+        # single pass; no intermediate copy of any layer is made
+        return _build_trie(*layers)
 
-    def _getitem_helper(self, key, dict_obj):
-        try:
-            key = key.upper()
-        except AttributeError:
-            raise ValueError((
-                "Birch does not support non-string keys! "
-                "{} provided as key!".format(key)
-            ))
-        if self._root2 in key:
-            key = key[self._root_len2:]
-        elif self._root1 in key:
-            key = key[self._root_len1:]
-        if SEP in key:
-            key_tuple = key.split(SEP)
-        else:
-            key_tuple = [key]
-        try:
-            res = dict_obj[key]
-        except KeyError:
-            res = safe_nested_val(key_tuple, dict_obj, self._no_val)
-        if res == self._no_val:
-            raise KeyError("{}: No configuration value for {}.".format(
-                self.namespace, key))
-        return res
+    def _apply_default_casters(self, val_dict):
+        """Returns the default-casted form of values in the given trie.
+
+        Default casters are thus applied once per reload, rather than on every
+        value access. Values failing to be casted are marked, so that an error
+        is raised when they are accessed.
+
+        Returns
+        -------
+        dict of tuple to object
+            A mapping of the key path of every value with a default caster to
+            its casted form, or to a _FailedCast object.
+        """
+        casted = {}
+        for key_tuple, def_caster in self._caster_index.items():
+            val = _get_path(val_dict, key_tuple, self._no_val)
+            if val is self._no_val:
+                continue
+            try:
+                casted[key_tuple] = def_caster(val)
+            except ValueError:
+                casted[key_tuple] = _FailedCast(
+                    f"{self.namespace}: Bad configuration value {val} failed "
+                    f"to be casted with default caster {def_caster}."
+                )
+            except TypeError:
+                pass
+        return casted
+
+    def key_cache_info(self):
+        """Returns hit and miss statistics of the normalized keys memo.
+
+        Returns
+        -------
+        functools._CacheInfo
+            A named tuple with hits, misses, maxsize and currsize fields, as
+            returned by the cache_info() method of functools.lru_cache.
+        """
+        return self._normalize_key.cache_info()
+
+    def _accessed_snapshot(self):
+        """Returns the current snapshot, reloading it first if configured to.
+        """
+        if self._on_access is not None:
+            self._on_access()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._current_snapshot()
+        return snapshot
+
+    def snapshot(self):
+        """Returns the current snapshot of configuration values.
+
+        The returned snapshot never changes; reloading configuration values
+        builds a new snapshot instead. All values read from it are thus of
+        the same generation, and it can be read from any thread without
+        locks. Automatic reloading, if configured, is done once - before the
+        snapshot is returned.
+
+        Returns
+        -------
+        Snapshot
+            The current snapshot of configuration values.
+
+        Example
+        -------
+        >>> import os; os.environ['ZUBAT__PORT'] = '555'
+        >>> zubat_cfg = Birch('zubat')
+        >>> snapshot = zubat_cfg.snapshot()
+        >>> snapshot.get('port', caster=int)
+        555
+        """
+        return self._accessed_snapshot()
 
     # implementing a collections.abc.Mapping abstract method
     def __getitem__(self, key):
-        if self._auto_reload:
-            self.reload()
-        val = self._getitem_helper(key, self._val_dict)
-        try:
-            def_caster = self._getitem_helper(key, self._default_casters)
-        except (KeyError, TypeError):
-            return val
-        try:
-            return def_caster(val)
-        except ValueError:
-            raise ValueError(
-                f"{self.namespace}: Bad configuration value {val} failed "
-                f"to be casted with default caster {def_caster}."
-            )
-        except TypeError:
-            return val
+        if self._on_access is not None:
+            self._on_access()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._current_snapshot()
+        return snapshot[key]
+
+    def __contains__(self, key):
+        return key in self._accessed_snapshot()
 
     def mget(self, key, caster=None):
         """Return the value for key if it's in the configuration.
@@ -318,16 +1129,116 @@ class Birch(collections.abc.Mapping):
           ...
         ValueError: zubat: Bad configuration value Banana failed to be casted with caster <class 'int'>.
         """  # noqa: E501
-        if caster:
-            try:
-                val = self[key]
-                return caster(val)
-            except ValueError:
-                raise ValueError(
-                    f"{self.namespace}: Bad configuration value {val} failed "
-                    f"to be casted with caster {caster}."
-                )
-        return self[key]
+        return self._accessed_snapshot().mget(key, caster=caster)
+
+    def mget_many(self, keys, casters=None, as_dict=False):
+        """Return the values of all given keys, read from a single snapshot.
+
+        Automatic reloading, if configured, is done at most once per call, and
+        all values are read from the same configuration snapshot.
+
+        Parameters
+        ----------
+        keys : list of str
+            The keys of the values to get.
+        casters : dict of str to callable, optional
+            A mapping of keys to caster callables. Any found value of a key is
+            passed through its caster, if one is given, after any default
+            caster configured for it.
+        as_dict : bool, default False
+            If set to True, a dict mapping each key to its value is returned.
+
+        Returns
+        -------
+        tuple or dict
+            The values of the given keys, in the same order.
+
+        Raises
+        ------
+        KeyError
+            If any of the given keys is not in the configuration.
+
+        Example
+        -------
+        >>> import os; os.environ['ZUBAT__PORT'] = '555'
+        >>> os.environ['ZUBAT__USER'] = 'admin'
+        >>> zubat_cfg = Birch('zubat')
+        >>> zubat_cfg.mget_many(['user', 'port'], casters={'port': int})
+        ('admin', 555)
+        """
+        return self._accessed_snapshot().mget_many(
+            keys, casters=casters, as_dict=as_dict)
+
+    def get_many(self, keys, defaults=None, casters=None, as_dict=False):
+        """Return the values of all given keys, or defaults if not found.
+
+        Automatic reloading, if configured, is done at most once per call, and
+        all values are read from the same configuration snapshot.
+
+        Parameters
+        ----------
+        keys : list of str
+            The keys of the values to get.
+        defaults : dict of str to object, optional
+            A mapping of keys to default values. If a key is not found, its
+            default value is returned in its place, or None if it has none.
+        casters : dict of str to callable, optional
+            A mapping of keys to caster callables. Any found value of a key is
+            passed through its caster, if one is given, after any default
+            caster configured for it.
+        as_dict : bool, default False
+            If set to True, a dict mapping each key to its value is returned.
+
+        Returns
+        -------
+        tuple or dict
+            The values of the given keys, in the same order.
+
+        Example
+        -------
+        >>> import os; os.environ['ZUBAT__PORT'] = '555'
+        >>> zubat_cfg = Birch('zubat')
+        >>> zubat_cfg.get_many(
+        ...     ['port', 'protocol'], defaults={'protocol': 'http'},
+        ...     casters={'port': int}, as_dict=True)
+        {'port': 555, 'protocol': 'http'}
+        """
+        return self._accessed_snapshot().get_many(
+            keys, defaults=defaults, casters=casters, as_dict=as_dict)
+
+    def handle(self, key, caster=None, default=None):
+        """Returns a handle for efficient repeated access to a key's value.
+
+        The key is normalized once, and its value is resolved and casted once
+        per configuration snapshot, rather than on every access. Use the value
+        attribute of the returned handle, or call it, to get the value.
+
+        Parameters
+        ----------
+        key : str
+            The key of the value to get.
+        caster : callable, optional
+            If given, any found value is passed through the caster. If a
+            default caster was already configured for this, then it will be
+            applied first, and this caster callable will be applied to the
+            casted result of the default caster.
+        default : object, optional
+            If the key is not found, this value is the value of the handle.
+
+        Returns
+        -------
+        KeyHandle
+            A handle to the value of the given key.
+
+        Example
+        -------
+        >>> import os; os.environ['ZUBAT__PORT'] = '555'
+        >>> zubat_cfg = Birch('zubat')
+        >>> port = zubat_cfg.handle('port', caster=int)
+        >>> port.value
+        555
+        """
+        return KeyHandle(self, key, caster=caster, default=default)
 
     def get(self, key, default=None, caster=None, throw=False, warn=False):
         """Return the value for key if it's in the configuration, else default.
@@ -371,34 +1282,71 @@ class Birch(collections.abc.Mapping):
         'defhost'
         >>> zubat_cfg.get('host')  # No error is thrown
         """
-        try:
-            return self.mget(key=key, caster=caster)
-        except KeyError as e:
-            if default is None:
-                if throw:
-                    raise e
-                if warn:
-                    warnings.warn((
-                        "None or no value was provided to configuration value "
-                        "{} for {}!").format(
-                            key, self.namespace))
-            return default
-
-    @staticmethod
-    def _leafcounter(node):
-        if isinstance(node, dict):
-            return sum([Birch._leafcounter(node[n]) for n in node])
-        # else:
-        return 1
+        if self._on_access is not None:
+            self._on_access()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._current_snapshot()
+        return snapshot.get(key, default, caster, throw, warn)
 
     # implementing a collections.abc.mapping abstract method
     def __len__(self):
-        return Birch._leafcounter(self._val_dict)
+        return len(self._accessed_snapshot())
 
     # implementing a collections.abc.mapping abstract method
     def __iter__(self):
-        for keytupl, value in key_tuple_value_nested_generator(self._val_dict):
-            yield SEP.join(keytupl), value
+        return iter(self._accessed_snapshot())
+
+    def keys(self):
+        """Returns a view of the keys of all configuration values.
+
+        Nested keys are joined by '__', and are given in lower case. All
+        views of a Birch object - returned by keys(), items() and values() -
+        are bound to the snapshot of configuration values that is current
+        when they are created, so that iterating over them yields values of a
+        single generation, and automatic reloading - if configured - is done
+        only once, when the view is created. Get a new view to see reloaded
+        values.
+
+        Returns
+        -------
+        collections.abc.KeysView
+            A view of the keys of all configuration values.
+        """
+        return self._accessed_snapshot().keys()
+
+    def items(self):
+        """Returns a view of the (key, value) pairs of all values.
+
+        Values are given as they are returned by item access; i.e. with
+        default casters applied. See keys() for more details.
+
+        Returns
+        -------
+        collections.abc.ItemsView
+            A view of the (key, value) pairs of all configuration values.
+
+        Example
+        -------
+        >>> import os; os.environ['KOFFING__SERVER__HOST'] = 'koffing.com'
+        >>> koffing_cfg = Birch('koffing', defaults={'server': {'port': 5}})
+        >>> sorted(koffing_cfg.items())
+        [('server__host', 'koffing.com'), ('server__port', 5)]
+        """
+        return self._accessed_snapshot().items()
+
+    def values(self):
+        """Returns a view of all configuration values.
+
+        Values are given as they are returned by item access; i.e. with
+        default casters applied. See keys() for more details.
+
+        Returns
+        -------
+        collections.abc.ValuesView
+            A view of all configuration values.
+        """
+        return self._accessed_snapshot().values()
 
     def as_str(self):
         """Returns a string representation of the configuration values dict.
@@ -408,7 +1356,7 @@ class Birch(collections.abc.Mapping):
         repr : str
             A string representation of the configuration values dict.
         """
-        return pprint.pformat(self._val_dict, indent=2)
+        return self._current_snapshot().as_str()
 
     def cfg_key_to_env_var(self, key):
         """Returns the environment variable corresponding to a given key.
@@ -0,0 +1,174 @@
+"""Configuration file deserializers for birch.
+
+Deserializers are resolved lazily - and any optional package they depend on
+is imported - only when a configuration file of a matching extension is
+first read, so that importing birch never pays for them.
+
+A deserializer is a (loads, kwargs) tuple, where loads is a callable
+accepting the raw bytes of a configuration file - read in a single system
+call where possible - and the given keyword arguments, and returning a dict.
+"""
+
+import os
+import importlib
+
+
+# fast JSON packages - providing a loads function accepting bytes - tried in
+# order by use_fast_json
+JSON_BACKENDS = ['orjson', 'ujson', 'simdjson']
+
+
+def _json_deserializer():
+    import json
+    return json.loads, {}
+
+
+def _yaml_loader():
+    try:
+        import yaml
+    except ImportError:  # pragma: no cover
+        return None
+    # the libyaml-based loader is an order of magnitude faster, but is only
+    # available if PyYAML was built with libyaml
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _yaml_deserializer():
+    loader = _yaml_loader()
+    if loader is None:  # pragma: no cover
+        return None
+    import yaml
+    # PyYAML detects the encoding of byte strings by itself
+    return yaml.load, {'Loader': loader}
+
+
+_EXT_TO_DESERIALIZER_FACTORY_MAP = {
+    '.json': _json_deserializer,
+    '.yml': _yaml_deserializer,
+    '.yaml': _yaml_deserializer,
+}
+
+# file extension to resolved deserializer; None if unavailable
+_EXT_TO_DESERIALIZER_MAP = {}
+
+
+def _deserializer(ext):
+    """Returns the deserializer of configuration files of an extension.
+
+    Parameters
+    ----------
+    ext : str
+        A file extension, including the leading dot; e.g. '.yml'.
+
+    Returns
+    -------
+    tuple or None
+        A (loads, kwargs) tuple, where loads is a callable accepting the
+        contents of a file as bytes and the given keyword arguments. If the
+        extension is unsupported, or the package required to deserialize it
+        is not installed, None is returned.
+    """
+    try:
+        return _EXT_TO_DESERIALIZER_MAP[ext]
+    except KeyError:
+        pass
+    factory = _EXT_TO_DESERIALIZER_FACTORY_MAP.get(ext)
+    deserializer = factory() if factory is not None else None
+    _EXT_TO_DESERIALIZER_MAP[ext] = deserializer
+    return deserializer
+
+
+def register_deserializer(ext, loads, **kwargs):
+    """Registers the deserializer used for configuration files of an extension.
+
+    Overrides any deserializer registered - or auto-detected - before for the
+    same extension, for all Birch objects. Configuration files already read
+    are not read again.
+
+    Parameters
+    ----------
+    ext : str
+        A file extension, including the leading dot; e.g. '.json'.
+    loads : callable
+        A callable accepting the contents of a configuration file as bytes,
+        and returning a dict; e.g. orjson.loads.
+    **kwargs
+        Additional keyword arguments to call loads with.
+    """
+    _EXT_TO_DESERIALIZER_MAP[ext] = (loads, kwargs)
+
+
+def use_fast_json():
+    """Reads JSON configuration files using a fast JSON package, if installed.
+
+    The first installed package of JSON_BACKENDS - e.g. orjson - is
+    registered as the deserializer of the '.json' extension, for all Birch
+    objects; see register_deserializer. This is opt-in, as these packages
+    read some valid JSON documents differently than the standard json module,
+    used by default; e.g. orjson reads integers too big for 64 bits as floats,
+    and rejects NaN values and lone surrogate escapes.
+
+    Returns
+    -------
+    str or None
+        The name of the registered package, or None if no package of
+        JSON_BACKENDS is installed, in which case the deserializer in use is
+        kept.
+    """
+    for name in JSON_BACKENDS:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        register_deserializer('.json', module.loads)
+        return name
+    return None
+
+
+def json_backend():
+    """Returns the name of the module used to read JSON configuration files.
+
+    The standard json module is used, unless a deserializer was registered for
+    the '.json' extension using register_deserializer or use_fast_json.
+
+    Returns
+    -------
+    str
+        The name of the module providing the JSON deserializer in use.
+    """
+    return _deserializer('.json')[0].__module__
+
+
+def _read_file_bytes(fpath):
+    """Returns file contents, read in a single system call if possible."""
+    fd = os.open(fpath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        # reading a byte beyond the expected size reaches the end of the file
+        # in a single read, even if the file has grown since the fstat call
+        size = os.fstat(fd).st_size + 1
+        chunks = []
+        while True:
+            chunk = os.read(fd, size)
+            chunks.append(chunk)
+            if len(chunk) < size:
+                return b''.join(chunks)
+    finally:
+        os.close(fd)
+
+
+def yaml_loader():
+    """Returns the PyYAML loader class used to read YAML configuration files.
+
+    yaml.CSafeLoader, which is based on the libyaml C library, is used if
+    PyYAML was built with libyaml. Otherwise, the pure-Python
+    yaml.SafeLoader is used.
+
+    Returns
+    -------
+    type or None
+        The PyYAML loader class in use, or None if PyYAML is not installed.
+    """
+    deserializer = _deserializer('.yml')
+    if deserializer is None:  # pragma: no cover
+        return None
+    return deserializer[1]['Loader']
@@ -0,0 +1,95 @@
+"""A process-wide index of environment variables for birch."""
+
+import os
+import threading
+
+
+def _environ_data():
+    # the dict underlying os.environ can be compared and copied at C speed,
+    # while iterating over os.environ decodes every variable
+    return getattr(os.environ, '_data', os.environ)
+
+
+class _EnvIndex(object):
+    """Partitions environment variables by a set of registered name prefixes.
+
+    All environment variables are scanned in a single pass, assigning each
+    to the partition of every registered prefix it starts with. The
+    environment is scanned again only once it changes, which is detected
+    by comparing it to a copy taken on the last scan; this is much cheaper
+    than scanning it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes = frozenset()
+        # a (copy of the environment, prefix to partition) tuple, published
+        # atomically on every scan
+        self._state = (None, {})
+
+    def register(self, prefix):
+        """Registers an environment variable name prefix to partition by.
+
+        Every prefix must end with an underscore.
+        """
+        with self._lock:
+            if prefix not in self._prefixes:
+                self._prefixes = self._prefixes | {prefix}
+                # the next lookup scans the environment again
+                self._state = (None, {})
+
+    def _scan(self):
+        partitions = {prefix: [] for prefix in self._prefixes}
+        for envar, value in os.environ.items():
+            end = envar.find('_')
+            while end != -1:
+                partition = partitions.get(envar[:end + 1])
+                if partition is not None:
+                    partition.append((envar, value))
+                end = envar.find('_', end + 1)
+        return {
+            prefix: frozenset(items) for prefix, items in partitions.items()}
+
+    def partition(self, prefix):
+        """Returns all environment variables starting with a registered prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            A registered environment variable name prefix.
+
+        Returns
+        -------
+        frozenset of tuple
+            A frozenset of the (name, value) tuples of all environment
+            variables starting with the given prefix.
+        """
+        data = _environ_data()
+        environ, partitions = self._state
+        if environ != data:
+            with self._lock:
+                environ, partitions = self._state
+                if environ != data:
+                    # copied before scanning, so that changes made during the
+                    # scan trigger another scan on the next lookup
+                    environ = dict(data)
+                    partitions = self._scan()
+                    self._state = (environ, partitions)
+        return partitions[prefix]
+
+
+_ENV_INDEX = _EnvIndex()
+
+
+def _register_envar_prefix(prefix):
+    """Registers an environment variable name prefix with the shared index."""
+    _ENV_INDEX.register(prefix)
+
+
+def _envar_items(prefix):
+    """Returns the (name, value) tuples of variables starting with a prefix.
+
+    See _EnvIndex.partition. The prefix must have been registered first using
+    _register_envar_prefix.
+    """
+    return _ENV_INDEX.partition(prefix)
@@ -1,6 +1,8 @@
 """Path-related functions for birch."""
 
 import os
+import stat
+import time
 
 
 def _legacy_cfg_dpath(namespace):
@@ -40,3 +42,105 @@ def _xdg_cache_dpath(namespace):
         '.cache',
         namespace,
     )
+
+
+def _fpath_fingerprint(fpath):
+    """Returns a cheap (mtime_ns, size, inode) fingerprint of a file.
+
+    None is returned if no regular file exists in the given path.
+    """
+    try:
+        fstat = os.stat(fpath)
+    except OSError:
+        return None
+    if not stat.S_ISREG(fstat.st_mode):
+        return None
+    return (fstat.st_mtime_ns, fstat.st_size, fstat.st_ino)
+
+
+# directory modifications made this many seconds before a directory is listed
+# might not change its mtime, on file systems with coarse mtime granularity
+_RACY_MTIME_WINDOW = 2
+
+# (directory path, name prefix) to (directory fingerprint, matching names)
+_DPATH_LISTINGS = {}
+
+
+def _dpath_fnames(dpath, prefix):
+    """Returns the names of all entries of a directory starting with a prefix.
+
+    The directory is listed using a single scandir call, and listings are
+    cached by the directory's mtime and inode, so that a directory is listed
+    again only once entries are added to it, removed from it or renamed.
+    Listings taken right after the directory was modified are not cached.
+
+    Parameters
+    ----------
+    dpath : str
+        The path of the directory to list.
+    prefix : str
+        Only the names of entries starting with this prefix are returned.
+
+    Returns
+    -------
+    frozenset of str
+        The names of matching entries. Empty if no directory exists in the
+        given path.
+    """
+    try:
+        dstat = os.stat(dpath)
+    except OSError:
+        return frozenset()
+    fingerprint = (dstat.st_mtime_ns, dstat.st_ino)
+    cached = _DPATH_LISTINGS.get((dpath, prefix))
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    listing_time = time.time()
+    try:
+        with os.scandir(dpath) as entries:
+            fnames = frozenset(
+                entry.name for entry in entries
+                if entry.name.startswith(prefix)
+            )
+    except OSError:
+        return frozenset()
+    if listing_time - dstat.st_mtime > _RACY_MTIME_WINDOW:
+        _DPATH_LISTINGS[(dpath, prefix)] = (fingerprint, fnames)
+    return fnames
+
+
+def _fpath_fingerprints(fpaths, fname_prefix=''):
+    """Returns the fingerprints of a list of files, as _fpath_fingerprint does.
+
+    Rather than checking every path separately, the parent directory of all
+    paths is listed once - see _dpath_fnames - and only files found in the
+    listing are checked. This saves a failing system call for every missing
+    file, which can be expensive on network file systems.
+
+    Parameters
+    ----------
+    fpaths : list of str
+        The paths of the files to fingerprint.
+    fname_prefix : str, default ''
+        A prefix common to the names of all given files.
+
+    Returns
+    -------
+    dict of str to tuple
+        A mapping of every given path to its fingerprint, or to None if no
+        regular file exists in it.
+    """
+    dpath_to_fnames = {}
+    fingerprints = {}
+    for fpath in fpaths:
+        dpath, fname = os.path.split(fpath)
+        try:
+            fnames = dpath_to_fnames[dpath]
+        except KeyError:
+            fnames = _dpath_fnames(dpath, fname_prefix)
+            dpath_to_fnames[dpath] = fnames
+        if fname in fnames:
+            fingerprints[fpath] = _fpath_fingerprint(fpath)
+        else:
+            fingerprints[fpath] = None
+    return fingerprints
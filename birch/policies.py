@@ -0,0 +1,180 @@
+"""Automatic configuration reload policies for birch."""
+
+import sys
+import time
+import weakref
+import itertools
+import threading
+
+
+class ReloadPolicy(object):
+    """Base class for automatic configuration reload policies.
+
+    A policy object is given to a Birch object using its ``auto_reload``
+    constructor parameter, and is bound to it on construction. A single policy
+    object can be bound to a single Birch object only.
+    """
+
+    # Called at the start of every value access when not None.
+    on_access = None
+
+    def __init__(self):
+        self._cfg_ref = None
+
+    def bind(self, cfg):
+        """Binds this policy to the given Birch object."""
+        if self._cfg_ref is not None:
+            raise ValueError(
+                "Reload policy objects can't be bound to more than one Birch"
+                " object! Create a new policy object for each Birch object.")
+        self._cfg_ref = weakref.ref(cfg)
+
+    def close(self):
+        """Stops any background activity of this policy."""
+
+
+class OnAccessReload(ReloadPolicy):
+    """Reloads changed configuration sources on every value access.
+
+    This is the policy used when ``auto_reload=True`` is given. Sources are
+    reloaded only if their fingerprint has changed.
+    """
+
+    def on_access(self):
+        self._cfg_ref()._reload_if_changed()
+
+
+class ThrottledReload(ReloadPolicy):
+    """Reloads changed configuration sources on value access, but not always.
+
+    Changed sources are reloaded on value access only if at least ``interval``
+    seconds have passed since they were last checked, or if at least
+    ``every`` value accesses were made since then. This is the policy used
+    when a number is given as ``auto_reload``, as the interval.
+
+    Parameters
+    ----------
+    interval : float, optional
+        The minimal interval, in seconds, between checks for changes in
+        configuration sources. A monotonic clock is used.
+    every : int, optional
+        The number of value accesses after which sources are checked for
+        changes, even if ``interval`` seconds have not passed yet.
+    """
+
+    def __init__(self, interval=None, every=None):
+        super().__init__()
+        if interval is None and every is None:
+            raise ValueError(
+                "At least one of interval and every must be provided!")
+        self.interval = interval
+        self.every = every
+        self._lock = threading.Lock()
+        # next() on itertools.count is atomic, unlike += on an int
+        self._access_counter = itertools.count(1)
+        self._last_check_access = 0
+        self._next_check_time = self._next_time()
+
+    def _next_time(self):
+        if self.interval is None:
+            return float('inf')
+        return time.monotonic() + self.interval
+
+    def _due(self, access):
+        if time.monotonic() >= self._next_check_time:
+            return True
+        return (
+            self.every is not None
+            and access - self._last_check_access >= self.every
+        )
+
+    def on_access(self):
+        access = next(self._access_counter)
+        if not self._due(access):
+            return
+        # if another thread is already reloading, current values are used
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._due(access):
+                self._cfg_ref()._reload_if_changed()
+                self._last_check_access = access
+                self._next_check_time = self._next_time()
+        finally:
+            self._lock.release()
+
+
+class BackgroundReload(ReloadPolicy):
+    """Reloads changed configuration sources periodically, in the background.
+
+    Value access is never blocked by reloading: it always returns values of
+    the latest published configuration, while reloading is done on a daemon
+    thread - or as an asyncio task, if an event loop is running in the
+    constructing thread - which atomically publishes reloaded values.
+
+    Parameters
+    ----------
+    interval : float, default 5
+        The interval, in seconds, between checks for changes in configuration
+        sources.
+    """
+
+    def __init__(self, interval=5):
+        super().__init__()
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._loop = None
+        self._task = None
+
+    def bind(self, cfg):
+        super().bind(cfg)
+        loop = None
+        # no event loop can be running if asyncio was never imported, so
+        # asyncio is not imported here, as doing so is relatively slow
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        if loop is not None:
+            self._loop = loop
+            self._task = loop.create_task(self._reload_periodically_async())
+        else:
+            threading.Thread(
+                target=self._reload_periodically,
+                name='birch-BackgroundReload',
+                daemon=True,
+            ).start()
+
+    def close(self):
+        self._stop_event.set()
+        if self._task is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def _reload(self):
+        cfg = self._cfg_ref()
+        if cfg is None:
+            return False
+        try:
+            cfg._reload_if_changed()
+        except Exception:  # pragma: no cover
+            # current values are kept until sources are valid again
+            pass
+        return True
+
+    def _reload_periodically(self):
+        while not self._stop_event.wait(self.interval):
+            if not self._reload():
+                return
+
+    async def _reload_periodically_async(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            await asyncio.sleep(self.interval)
+            if self._stop_event.is_set():
+                return
+            # sources are read and parsed off the event loop thread
+            if not await loop.run_in_executor(None, self._reload):
+                return
@@ -0,0 +1,244 @@
+"""Compact storage of configuration values for birch.
+
+Configuration values are stored in a trie of nested dicts - its nodes - in
+which SEP-joined keys are split into paths, so that every value is stored
+once, under its path, while being reachable both by nested access - e.g.
+node['server']['port'] - and by path - e.g. ('server', 'port'). Keys are
+stored in lower case. Tries - including all container values stored in
+them, like lists - are read-only once built.
+"""
+
+
+SEP = '__'
+
+_MISSING = object()
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Configuration values are read-only!")
+
+
+class _ReadOnlyDict(dict):
+    """A dict that can't be modified. Use copy() to get a modifiable dict."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # the default reduction of dicts fills them by item assignment
+        return (self.__class__, (dict(self),))
+
+
+class _ReadOnlyList(list):
+    """A list that can't be modified. Use copy() to get a modifiable list."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = _read_only
+    reverse = sort = _read_only
+
+    def __reduce__(self):
+        # the default reduction of lists fills them by appending
+        return (self.__class__, (list(self),))
+
+
+# read-only dicts are built using the dict implementation
+_dict_setitem = dict.__setitem__
+
+
+class _Node(_ReadOnlyDict):
+    """A read-only trie node; a dict with lower-case keys, in any casing.
+
+    Keys are lower-cased once, when the trie is built, so that looking up a
+    lower-case key - as is done when looking up a key path - is a plain dict
+    lookup. Keys in any other casing are lower-cased only if not found as
+    they are; i.e. by nested access such as cfg['SERVER']['PORT'].
+
+    Nodes can't be modified once built, so that they can be shared across
+    threads safely. Use the copy() method to get a modifiable dict.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        try:
+            lower_key = key.lower()
+        except AttributeError:
+            raise KeyError(key) from None
+        if lower_key != key:
+            value = self.get(lower_key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        try:
+            return dict.__contains__(self, key.lower())
+        except AttributeError:
+            return False
+
+
+_CONTAINER_TYPES = (list, tuple, set)
+# the types of values parsed configuration files mostly hold; containers
+# holding only such values are copied at C speed
+_SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def _frozen(value):
+    """Returns a read-only equivalent of a leaf value, copying it if needed.
+
+    Lists and dicts - e.g. dicts in lists - are converted into read-only lists
+    and dicts, sets into frozensets and tuples into tuples of read-only
+    values, recursively. Read-only values are returned as they are, so that
+    values of existing tries are not copied again. Other values are assumed
+    to be immutable, and are returned as they are.
+    """
+    cls = value.__class__
+    if cls is _ReadOnlyList or cls is _ReadOnlyDict or cls is frozenset:
+        return value
+    if isinstance(value, list):
+        if _SCALAR_TYPES.issuperset(map(type, value)):
+            return _ReadOnlyList(value)
+        return _ReadOnlyList([_frozen(item) for item in value])
+    if isinstance(value, dict):
+        return _ReadOnlyDict(
+            {key: _frozen(item) for key, item in value.items()})
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, tuple):
+        if _SCALAR_TYPES.issuperset(map(type, value)):
+            return value
+        return tuple([_frozen(item) for item in value])
+    return value
+
+
+def _freeze_values(dict_obj):
+    """Freezes all container values of a nested dict in place.
+
+    Frozen values are merged into tries as they are, so dicts merged into
+    many tries - like parsed configuration files, merged on every reload -
+    are better frozen once, rather than copied on every merge.
+    """
+    dicts = [dict_obj]
+    while dicts:
+        current = dicts.pop()
+        # only values of existing keys are replaced, which is safe while
+        # iterating
+        for key, value in current.items():
+            if value.__class__ in _SCALAR_TYPES:
+                continue
+            if isinstance(value, dict):
+                dicts.append(value)
+            elif value.__class__ is list and _SCALAR_TYPES.issuperset(
+                    map(type, value)):
+                # the common case, inlined
+                current[key] = _ReadOnlyList(value)
+            elif isinstance(value, _CONTAINER_TYPES):
+                current[key] = _frozen(value)
+    return dict_obj
+
+
+def _merge_value(node, key, value):
+    """Merges a value under a lower-case key of a trie node."""
+    if isinstance(value, dict):
+        child = node.get(key)
+        if not isinstance(child, _Node):
+            # leaves are replaced by nodes
+            child = _Node()
+            _dict_setitem(node, key, child)
+        _merge_into(child, value)
+    elif isinstance(value, _CONTAINER_TYPES):
+        # merged dicts - e.g. cached configuration layers - are never
+        # modified through the trie, so containers are frozen - and copied
+        _dict_setitem(node, key, _frozen(value))
+    else:
+        _dict_setitem(node, key, value)
+
+
+def _merge_into(node, dict_obj):
+    """Merges a nested dict into a trie node, splitting SEP-joined keys.
+
+    Values in the given dict override existing values of the same path, while
+    nested dicts are merged recursively into existing nodes. New nodes are
+    created for all nested dicts, so that the given dict is never referenced
+    by - and never modified through - the trie. Within a single dict,
+    SEP-joined keys are merged last, so that their values take precedence.
+    Non-string keys are stored as they are.
+
+    Every (key path, value) pair of the given dict is thus streamed into the
+    trie in a single pass, without building any intermediate structure.
+
+    Parameters
+    ----------
+    node : dict
+        The trie node to merge into.
+    dict_obj : dict
+        The dict to merge.
+    """
+    has_sep_keys = False
+    for key, value in dict_obj.items():
+        if isinstance(key, str):
+            if SEP in key:
+                has_sep_keys = True
+                continue
+            key = key.lower()
+        _merge_value(node, key, value)
+    if not has_sep_keys:
+        return
+    for key, value in dict_obj.items():
+        if isinstance(key, str) and SEP in key:
+            path = key.lower().split(SEP)
+            parent = node
+            for segment in path[:-1]:
+                child = parent.get(segment)
+                if not isinstance(child, _Node):
+                    child = _Node()
+                    _dict_setitem(parent, segment, child)
+                parent = child
+            _merge_value(parent, path[-1], value)
+
+
+def _build_trie(*dict_objs):
+    """Returns a new trie of the given dicts, merged in the given order.
+
+    The given dicts can be nested dicts of any form - e.g. parsed configuration
+    files - or tries themselves.
+    """
+    root = _Node()
+    for dict_obj in dict_objs:
+        _merge_into(root, dict_obj)
+    return root
+
+
+def _get_path(node, path, default):
+    """Returns the value under a path of lower-case keys in a trie.
+
+    If there is no such value, the given default is returned.
+    """
+    for key in path:
+        if not isinstance(node, dict):
+            return default
+        node = node.get(key, default)
+        if node is default:
+            return default
+    return node
+
+
+def _count_leaves(node):
+    """Returns the number of leaves - i.e. of non-dict values - in a trie."""
+    count = 0
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        # all nested dicts of a trie are nodes, and a class identity check is
+        # considerably faster than isinstance
+        children = [value for value in node.values()
+                    if value.__class__ is _Node]
+        count += len(node) - len(children)
+        nodes += children
+    return count
@@ -0,0 +1,236 @@
+"""Background watchers of configuration files for birch."""
+
+import os
+import sys
+import select
+import struct
+import threading
+
+from .paths import _fpath_fingerprint
+
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+# IN_CREATE and IN_MODIFY are not watched, as they are issued before a
+# written file is complete; IN_CLOSE_WRITE follows both.
+_WATCH_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+    | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+)
+_DPATH_GONE_MASK = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED
+
+_EVENT_STRUCT = struct.Struct('iIII')
+_READ_BUFFER_SIZE = 64 * 1024
+
+
+def _inotify_libc():
+    """Returns the C library if it provides inotify, or None otherwise."""
+    if not sys.platform.startswith('linux'):  # pragma: no cover
+        return None
+    # ctypes is imported only when watching, as importing it is relatively slow
+    import ctypes
+    import ctypes.util
+    try:
+        libc = ctypes.CDLL(
+            ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    return libc
+
+
+class _Watcher(object):
+    """Base class for background watchers of a set of file paths.
+
+    Parameters
+    ----------
+    fpaths : list of str
+        The paths of the files to watch. Files need not exist.
+    fingerprints : dict of str to object
+        A mapping of every watched path to its fingerprint at the time it was
+        last loaded, as returned by _fpath_fingerprint.
+    callback : callable
+        Called with a list of the paths of changed files whenever a change is
+        detected. Watching stops if it returns False.
+    interval : float
+        The interval, in seconds, in which the watcher checks for changes or
+        whether it was stopped.
+    """
+
+    def __init__(self, fpaths, fingerprints, callback, interval):
+        self._fpaths = list(fpaths)
+        self._fingerprints = {
+            fpath: fingerprints.get(fpath) for fpath in self._fpaths}
+        self._callback = callback
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='birch-{}'.format(type(self).__name__),
+            daemon=True,
+        )
+
+    def start(self):
+        """Starts watching in a background daemon thread."""
+        self._thread.start()
+
+    def stop(self):
+        """Stops watching. The background thread exits shortly after."""
+        self._stop_event.set()
+
+    def _changed(self, fpaths):
+        changed = []
+        for fpath in fpaths:
+            fingerprint = _fpath_fingerprint(fpath)
+            if fingerprint != self._fingerprints[fpath]:
+                self._fingerprints[fpath] = fingerprint
+                changed.append(fpath)
+        return changed
+
+    def _notify(self, fpaths):
+        changed = self._changed(fpaths)
+        if changed and self._callback(changed) is False:
+            self.stop()
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class _PollingWatcher(_Watcher):
+    """Watches files by polling their fingerprints every interval."""
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            self._notify(self._fpaths)
+
+
+class _InotifyWatcher(_Watcher):
+    """Watches files using inotify watches on their parent directories.
+
+    Directories are watched, rather than files, so that files that do not
+    exist yet, or that are atomically replaced by renaming, are also
+    watched. Directories that do not exist are periodically re-checked.
+    """
+
+    def __init__(self, fpaths, fingerprints, callback, interval, libc):
+        super().__init__(fpaths, fingerprints, callback, interval)
+        self._libc = libc
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:  # pragma: no cover
+            import ctypes
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dpath_to_fpaths = {}
+        for fpath in self._fpaths:
+            dpath = os.path.dirname(fpath)
+            self._dpath_to_fpaths.setdefault(dpath, []).append(fpath)
+        self._wd_to_dpaths = {}
+        self._unwatched_dpaths = set(self._dpath_to_fpaths)
+
+    def _watch_dpaths(self):
+        """Tries to watch all unwatched directories.
+
+        Returns the paths of all files in newly watched directories.
+        """
+        fpaths = []
+        for dpath in list(self._unwatched_dpaths):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(dpath), _WATCH_MASK)
+            if wd >= 0:
+                self._unwatched_dpaths.discard(dpath)
+                self._wd_to_dpaths.setdefault(wd, set()).add(dpath)
+                fpaths.extend(self._dpath_to_fpaths[dpath])
+        return fpaths
+
+    def _read_events(self):
+        """Reads pending events, returning paths of possibly changed files."""
+        fpaths = set()
+        try:
+            data = os.read(self._fd, _READ_BUFFER_SIZE)
+        except BlockingIOError:  # pragma: no cover
+            return fpaths
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = _EVENT_STRUCT.unpack_from(data, offset)
+            offset += _EVENT_STRUCT.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+            fpaths.update(self._event_fpaths(wd, mask, name))
+        return fpaths
+
+    def _event_fpaths(self, wd, mask, name):
+        """Returns the paths of files possibly changed by a single event."""
+        if mask & _IN_Q_OVERFLOW:  # pragma: no cover
+            return self._fpaths
+        dpaths = self._wd_to_dpaths.get(wd)
+        if dpaths is None:
+            return []
+        fpaths = []
+        if mask & _DPATH_GONE_MASK:
+            # the directory itself is gone; re-watch it once it reappears
+            del self._wd_to_dpaths[wd]
+            if not mask & _IN_IGNORED:
+                self._libc.inotify_rm_watch(self._fd, wd)
+            for dpath in dpaths:
+                self._unwatched_dpaths.add(dpath)
+                fpaths.extend(self._dpath_to_fpaths[dpath])
+            return fpaths
+        for dpath in dpaths:
+            fpath = os.path.join(dpath, name)
+            if fpath in self._fingerprints:
+                fpaths.append(fpath)
+        return fpaths
+
+    def _run(self):
+        try:
+            # catches changes made before the first watches were added
+            self._watch_dpaths()
+            self._notify(self._fpaths)
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._fd], [], [], self._interval)
+                if self._stop_event.is_set():
+                    break
+                fpaths = set(self._watch_dpaths())
+                if ready:
+                    fpaths.update(self._read_events())
+                if fpaths:
+                    self._notify([f for f in self._fpaths if f in fpaths])
+        finally:
+            os.close(self._fd)
+
+
+def _watch_fpaths(fpaths, fingerprints, callback, interval):
+    """Starts watching the given file paths in a background thread.
+
+    An inotify-based watcher is used when available, and a polling one
+    otherwise. See _Watcher for a description of the parameters.
+
+    Returns
+    -------
+    watcher : _Watcher
+        The started watcher object. Call its stop() method to stop watching.
+    """
+    libc = _inotify_libc()
+    watcher = None
+    if libc is not None:
+        try:
+            watcher = _InotifyWatcher(
+                fpaths, fingerprints, callback, interval, libc)
+        except OSError:  # pragma: no cover
+            pass
+    if watcher is None:
+        watcher = _PollingWatcher(fpaths, fingerprints, callback, interval)
+    watcher.start()
+    return watcher
@@ -0,0 +1,20 @@
+"""Shared fixtures for the birch test suite."""
+
+import time
+
+import pytest
+
+
+def _wait_for(predicate, timeout=10):
+    start = time.time()
+    while time.time() - start < timeout:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def wait_for():
+    """Returns a function polling a predicate until it holds or times out."""
+    return _wait_for
@@ -0,0 +1,118 @@
+"""Testing persistent caching of parsed configuration files for birch."""
+
+import os
+import json
+import time
+import stat
+import pickle
+from unittest import mock
+
+import pytest
+
+from birch import Birch
+
+
+NSPACE = 'cachetest'
+
+
+@pytest.fixture
+def cache_home(tmp_path, monkeypatch):
+    cache_dpath = str(tmp_path / 'cache')
+    monkeypatch.setenv('XDG_CACHE_HOME', cache_dpath)
+    return cache_dpath
+
+
+def _write_cfg(fpath, val_dict, age=60):
+    with open(fpath, 'w') as cfile:
+        json.dump(val_dict, cfile)
+    # files modified right before they are read are not cached
+    mtime = time.time() - age
+    os.utime(fpath, (mtime, mtime))
+
+
+def test_cache(tmp_path, cache_home, monkeypatch):
+    dpath = str(tmp_path / 'cfg')
+    os.makedirs(dpath)
+    fpath = os.path.join(dpath, 'cfg.json')
+    _write_cfg(fpath, {'server': {'port': 1}})
+    monkeypatch.setenv(NSPACE.upper() + '__HOST', 'zubat.com')
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['server__port'] == 1
+    cache_dpath = os.path.join(cache_home, NSPACE)
+    cache_fnames = os.listdir(cache_dpath)
+    assert len(cache_fnames) == 1
+    with open(os.path.join(cache_dpath, cache_fnames[0]), 'rb') as cfile:
+        assert b'zubat.com' not in cfile.read()
+
+    read_cfg_file = mock.create_autospec(
+        Birch._read_cfg_file, side_effect=Birch._read_cfg_file)
+    monkeypatch.setattr(Birch, '_read_cfg_file', read_cfg_file)
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['server']['port'] == 1
+    assert cfg['host'] == 'zubat.com'
+    read_cfg_file.assert_not_called()
+    _write_cfg(fpath, {'server': {'port': 22}}, age=30)
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['server__port'] == 22
+    read_cfg_file.assert_called_once_with(mock.ANY, fpath)
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['server__port'] == 22
+    read_cfg_file.assert_called_once_with(mock.ANY, fpath)
+
+
+def test_corrupt_cache(tmp_path, cache_home):
+    dpath = str(tmp_path / 'cfg')
+    os.makedirs(dpath)
+    _write_cfg(os.path.join(dpath, 'cfg.json'), {'port': 1})
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    cache_fpath = cfg._layer_cache_fpath()
+    with open(cache_fpath, 'wb') as cfile:
+        cfile.write(b'not a pickle')
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['port'] == 1
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg._layer_cache[cfg._cfg_fpaths()[0]][1]['port'] == 1
+    with open(cache_fpath, 'wb') as cfile:
+        pickle.dump((0, {}), cfile)
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['port'] == 1
+
+
+def test_recently_modified_files_are_not_cached(tmp_path, cache_home):
+    dpath = str(tmp_path / 'cfg')
+    os.makedirs(dpath)
+    fpath = os.path.join(dpath, 'cfg.json')
+    _write_cfg(fpath, {'port': 1}, age=0)
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['port'] == 1
+    assert not os.path.exists(cfg._layer_cache_fpath())
+    # a same-size rewrite within the same mtime tick is not served stale
+    mtime_ns = os.stat(fpath).st_mtime_ns
+    with open(fpath, 'w') as cfile:
+        json.dump({'port': 2}, cfile)
+    os.utime(fpath, ns=(mtime_ns, mtime_ns))
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['port'] == 2
+
+
+def test_untrusted_cache_is_ignored(tmp_path, cache_home):
+    dpath = str(tmp_path / 'cfg')
+    os.makedirs(dpath)
+    _write_cfg(os.path.join(dpath, 'cfg.json'), {'port': 1})
+    cfg = Birch(NSPACE, directories=dpath, cache=True)
+    assert cfg['port'] == 1
+    cache_fpath = cfg._layer_cache_fpath()
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache_fpath)).st_mode) == (
+        0o700)
+    read_cfg_file = Birch._read_cfg_file
+    with mock.patch.object(Birch, '_read_cfg_file', autospec=True,
+                           side_effect=read_cfg_file) as read_mock:
+        cfg = Birch(NSPACE, directories=dpath, cache=True)
+        assert cfg['port'] == 1
+        assert read_mock.call_count == 0
+        os.chmod(cache_fpath, 0o622)
+        cfg = Birch(NSPACE, directories=dpath, cache=True)
+        assert cfg['port'] == 1
+        assert read_mock.call_count == 1
+    # untrusted cache files are replaced
+    assert not os.stat(cache_fpath).st_mode & (stat.S_IWGRP | stat.S_IWOTH)
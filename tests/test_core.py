@@ -1,13 +1,18 @@
 """Test common skift functionalities."""
 
+import gc
 import os
 import json
 import copy
+import weakref
 import shutil
+import collections
+import threading
+from unittest import mock
 
 import pytest
 import yaml
-from birch import Birch
+from birch import Birch, policies
 from birch.exceptions import UnsupporedFormatException
 from birch.core import _xdg_cfg_dpath
 
@@ -176,7 +181,7 @@ def test_json():
     assert cfg.get('JON', default='Hello') == 'Hello'
     with pytest.raises(KeyError):
         assert cfg.get('JON', throw=True) is None
-    assert len(cfg) == 17
+    assert len(cfg) == 13
     for name, value in cfg:
         assert isinstance(name, str)
     assert isinstance(cfg.as_str(), str)
@@ -361,6 +366,128 @@ def test_yaml_with_auto_reload():
     assert cfg['LONE'] == lone_val
 
 
+def test_auto_reload_skips_unchanged_sources():
+    prepare_namespace_2()
+    dpath = os.path.join(
+        os.path.expanduser('~'),
+        '.{}'.format(NSPACE2),
+    )
+    cfg = Birch(
+        NSPACE2,
+        directories=[dpath],
+        supported_formats=['yaml'],
+        auto_reload=True,
+    )
+    build_val_dict = cfg._build_val_dict = mock.Mock(wraps=cfg._build_val_dict)
+    for _ in range(5):
+        assert cfg['lone'] == 'puf'
+        assert cfg['mole'] == 'geers'
+    assert build_val_dict.call_count == 0
+    os.environ[NSPACE2.upper() + '__MOLE'] = 'zubi'
+    assert cfg['mole'] == 'zubi'
+    assert cfg['lone'] == 'puf'
+    assert build_val_dict.call_count == 1
+    updated_valdict = copy.deepcopy(VAL_DICT2)
+    updated_valdict['lone'] = 'a much longer value'
+    setup_cfg_file(namespace=NSPACE2, val_dict=updated_valdict, ext='yml')
+    assert cfg['lone'] == 'a much longer value'
+    assert cfg['mole'] == 'zubi'
+    assert build_val_dict.call_count == 2
+    prepare_namespace_2()
+
+
+def test_auto_reload_never_publishes_older_values(monkeypatch):
+    monkeypatch.setenv('RACETEST__PORT', '1')
+    cfg = Birch('racetest', directories=[], auto_reload=True)
+    assert cfg['port'] == '1'
+    source_fingerprints = cfg._source_fingerprints
+    checks = []
+
+    def racing_source_fingerprints(sources):
+        fingerprints = source_fingerprints(sources)
+        if not checks:
+            checks.append(1)
+            # another thread reloads newer values after the check has read
+            # the fingerprints of sources, but before it reloads them
+            monkeypatch.setenv('RACETEST__PORT', '3')
+            cfg.reload()
+        return fingerprints
+
+    monkeypatch.setenv('RACETEST__PORT', '2')
+    monkeypatch.setattr(
+        cfg, '_source_fingerprints', racing_source_fingerprints)
+    cfg._reload_if_changed()
+    # read without triggering another automatic reload
+    assert cfg._snapshot['port'] == '3'
+
+
+def test_reload_only_given_sources(tmp_path):
+    dpath1 = str(tmp_path / 'a')
+    dpath2 = str(tmp_path / 'b')
+    os.makedirs(dpath1)
+    os.makedirs(dpath2)
+    fpath1 = os.path.join(dpath1, 'cfg.json')
+    fpath2 = os.path.join(dpath2, 'cfg.json')
+    with open(fpath1, 'w') as cfile:
+        json.dump({'first': 'a'}, cfile)
+    with open(fpath2, 'w') as cfile:
+        json.dump({'second': 'b'}, cfile)
+    cfg = Birch(
+        NSPACE2,
+        directories=[dpath1, dpath2],
+        load_all=True,
+        defaults={'third': 'c'},
+    )
+    assert cfg['first'] == 'a'
+    assert cfg['second'] == 'b'
+    assert cfg['third'] == 'c'
+    read_cfg_file = cfg._read_cfg_file = mock.Mock(wraps=cfg._read_cfg_file)
+    with open(fpath2, 'w') as cfile:
+        json.dump({'second': 'bb'}, cfile)
+    cfg.reload(sources=fpath2)
+    read_cfg_file.assert_called_once_with(fpath2)
+    assert cfg['first'] == 'a'
+    assert cfg['second'] == 'bb'
+    assert cfg['third'] == 'c'
+    os.environ[NSPACE2.upper() + '__MOLE'] = 'zubi'
+    cfg.reload(sources=['env'])
+    read_cfg_file.assert_called_once_with(fpath2)
+    assert cfg['mole'] == 'zubi'
+    cfg.reload(sources='files')
+    read_cfg_file.assert_has_calls(
+        [mock.call(fpath1), mock.call(fpath2)], any_order=True)
+    assert read_cfg_file.call_count == 3
+    with pytest.raises(ValueError):
+        cfg.reload(sources=['env', 'nosuchsource'])
+    prepare_namespace_2()
+
+
+def test_reload_after_changing_directories(tmp_path):
+    dpath1 = str(tmp_path / 'a')
+    dpath2 = str(tmp_path / 'b')
+    os.makedirs(dpath1)
+    os.makedirs(dpath2)
+    with open(os.path.join(dpath1, 'cfg.json'), 'w') as cfile:
+        json.dump({'port': 1}, cfile)
+    with open(os.path.join(dpath2, 'cfg.json'), 'w') as cfile:
+        json.dump({'port': 2}, cfile)
+    cfg = Birch('dirchangetest', directories=[dpath1])
+    assert cfg['port'] == 1
+    cfg.directories = [dpath2]
+    # partial reloads don't read new sources, but don't fail on them either
+    cfg.reload(sources='env')
+    assert 'port' not in cfg
+    cfg.reload()
+    assert cfg['port'] == 2
+    cfg.directories.insert(0, dpath1)
+    cfg.reload()
+    assert cfg['port'] == 1
+    auto_cfg = Birch('dirchangetest', directories=[dpath1], auto_reload=True)
+    assert auto_cfg['port'] == 1
+    auto_cfg.directories = [dpath2]
+    assert auto_cfg['port'] == 2
+
+
 def test_envvars_with_defaults():
     prepare_namespace_2()
     k1 = 'NAKOKO'
@@ -405,6 +532,369 @@ def test_envvars_with_defaults():
         )
 
 
+def test_contains():
+    cfg = Birch(NSPACE, load_all=True, defaults={'nest': {3: 'a', 'b': 4}})
+    assert 'basekey' in cfg
+    assert 'SERVER__PORT' in cfg
+    assert 'server' in cfg
+    assert '{}_server__port'.format(NSPACE) in cfg
+    assert '{}__server__port'.format(NSPACE) in cfg
+    assert 'nest__b' in cfg
+    assert 'JON' not in cfg
+    assert 'server__jon' not in cfg
+    with pytest.raises(ValueError):
+        assert 54 in cfg
+    with pytest.raises(KeyError, match='for JON'):
+        cfg['{}__JON'.format(NSPACE)]
+    with pytest.raises(KeyError, match='for JON'):
+        cfg['{}_JON'.format(NSPACE)]
+    with pytest.raises(KeyError, match='for JON'):
+        cfg.get('{}_JON'.format(NSPACE), throw=True)
+    with pytest.raises(ValueError):
+        cfg.mget('basekey', caster=int)
+    assert cfg.get('mike', caster=int) == 88
+
+
+def test_key_cache():
+    cfg = Birch(NSPACE, load_all=True, key_cache_size=2)
+    assert cfg['basekey'] == 'base_val'
+    assert cfg['basekey'] == 'base_val'
+    assert cfg.get('{}__server__port'.format(NSPACE)) == 1293
+    info = cfg.key_cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.maxsize == 2
+    assert cfg['nega'] == 'Uvavo'
+    assert cfg['basekey'] == 'base_val'
+    assert cfg.key_cache_info().currsize == 2
+    assert cfg.key_cache_info().misses == 4
+    with pytest.raises(ValueError):
+        cfg[['basekey']]
+
+
+def test_handle():
+    os.environ[NSPACE.upper() + '__MIKE'] = str(88)
+    cfg = Birch(NSPACE, load_all=True)
+    mike = cfg.handle('{}__mike'.format(NSPACE), caster=int)
+    port = cfg.handle('server__port', default=3)
+    jon = cfg.handle('JON', default='Hello')
+    assert mike.value == 88
+    assert mike() == 88
+    assert port.value == 1293
+    assert jon.value == 'Hello'
+    os.environ[NSPACE.upper() + '__MIKE'] = str(89)
+    assert mike.value == 88
+    cfg.reload()
+    assert mike.value == 89
+    os.environ[NSPACE.upper() + '__MIKE'] = 'eighty'
+    cfg.reload()
+    with pytest.raises(ValueError):
+        mike.value
+    with pytest.raises(ValueError):
+        cfg.handle(54)
+    os.environ[NSPACE.upper() + '__MIKE'] = str(88)
+
+
+def test_get_many():
+    cfg = Birch(NSPACE, load_all=True, auto_reload=True)
+    reload_if_changed = cfg._reload_if_changed = mock.Mock(
+        wraps=cfg._reload_if_changed)
+    keys = ['basekey', 'server__port', 'mike', 'jon']
+    assert cfg.get_many(keys) == ('base_val', 1293, '88', None)
+    assert reload_if_changed.call_count == 1
+    assert cfg.get_many(
+        keys, defaults={'jon': 'Hello'}, casters={'mike': int},
+        as_dict=True,
+    ) == {
+        'basekey': 'base_val', 'server__port': 1293, 'mike': 88,
+        'jon': 'Hello',
+    }
+    assert reload_if_changed.call_count == 2
+    assert cfg.mget_many(
+        iter(keys[:3]), casters={'mike': float}) == ('base_val', 1293, 88.0)
+    assert cfg.mget_many(keys[:1], as_dict=True) == {'basekey': 'base_val'}
+    with pytest.raises(KeyError):
+        cfg.mget_many(keys)
+    with pytest.raises(ValueError):
+        cfg.get_many(keys, casters={'basekey': int})
+
+
+def test_lazy(monkeypatch):
+    build_val_dict = mock.create_autospec(
+        Birch._build_val_dict, side_effect=Birch._build_val_dict)
+    monkeypatch.setattr(Birch, '_build_val_dict', build_val_dict)
+    cfg = Birch(NSPACE, load_all=True, lazy=True)
+    assert build_val_dict.call_count == 0
+    barrier = threading.Barrier(8)
+    vals = []
+
+    def access():
+        barrier.wait()
+        vals.append(cfg['server__port'])
+
+    threads = [threading.Thread(target=access) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert vals == [1293] * 8
+    assert build_val_dict.call_count == 1
+
+    for access in [
+        lambda cfg: cfg.get('basekey') == 'base_val',
+        lambda cfg: 'basekey' in cfg,
+        lambda cfg: len(cfg) > 0,
+        lambda cfg: cfg.handle('basekey').value == 'base_val',
+        lambda cfg: cfg.get_many(['basekey']) == ('base_val',),
+        lambda cfg: cfg.reload(sources='env') is None,
+    ]:
+        build_val_dict.reset_mock()
+        cfg = Birch(NSPACE, load_all=True, lazy=True, auto_reload=True)
+        assert build_val_dict.call_count == 0
+        assert access(cfg)
+        assert build_val_dict.call_count == 1
+        assert cfg['server']['port'] == 1293
+
+    build_val_dict.reset_mock()
+    monkeypatch.setattr(Birch, 'lazy_by_default', True)
+    cfg = Birch(NSPACE)
+    assert build_val_dict.call_count == 0
+    with pytest.raises(UnsupporedFormatException):
+        Birch(NSPACE2, supported_formats=['yaml', 'lie'])
+
+
+def test_prefetch(monkeypatch):
+    loading_threads = []
+    started = threading.Event()
+    release = threading.Event()
+    build_val_dict = Birch._build_val_dict
+
+    def blocking_build_val_dict(self):
+        loading_threads.append(threading.current_thread())
+        started.set()
+        release.wait()
+        return build_val_dict(self)
+
+    monkeypatch.setattr(Birch, '_build_val_dict', blocking_build_val_dict)
+    cfg = Birch(NSPACE, load_all=True, prefetch=True)
+    assert started.wait(5)
+    assert cfg._snapshot is None
+    vals = []
+    accessing_thread = threading.Thread(
+        target=lambda: vals.append(cfg['basekey']))
+    accessing_thread.start()
+    accessing_thread.join(0.1)
+    assert vals == []
+    release.set()
+    accessing_thread.join()
+    assert vals == ['base_val']
+    assert len(loading_threads) == 1
+    assert loading_threads[0] is not threading.current_thread()
+    assert loading_threads[0] is not accessing_thread
+
+
+def test_layers_are_merged_deeply(monkeypatch):
+    monkeypatch.setenv('DEEPTEST__SERVER__PORT', '2')
+    cfg = Birch('deeptest', directories=[], defaults={
+        'server': {'port': 1, 'host': 'h'},
+        'a__b': 3,
+        'a': {'c': 4},
+    })
+    assert cfg['server__port'] == '2'
+    assert cfg['server']['host'] == 'h'
+    assert cfg['a'] == {'b': 3, 'c': 4}
+    # every value is stored, and counted, once
+    assert len(cfg) == 4
+    assert sorted(name for name, _ in cfg) == [
+        'a__b', 'a__c', 'server__host', 'server__port']
+
+
+def test_file_layers_are_kept_as_parsed(tmpdir):
+    dpath = str(tmpdir)
+    fpath = os.path.join(dpath, 'cfg.json')
+    val_dict = {'server': {'port': 1}, 'a__b': 2}
+    with open(fpath, 'w') as cfile:
+        json.dump(val_dict, cfile)
+    cfg = Birch('parsedtest', directories=[dpath])
+    layer = cfg._layers[fpath]
+    assert layer == val_dict
+    assert cfg['a']['b'] == 2
+    assert cfg['server'] is not layer['server']
+    cfg.reload(sources='env')
+    assert cfg._layers[fpath] is layer
+    assert layer == val_dict
+
+
+def test_snapshot(monkeypatch):
+    monkeypatch.setenv('SNAPTEST__SERVER__PORT', '1')
+    monkeypatch.setenv('SNAPTEST__SERVER__HOST', 'h')
+    cfg = Birch('snaptest', directories=[], defaults={'timeout': '5'},
+                default_casters={'timeout': int}, auto_reload=True)
+    snapshot = cfg.snapshot()
+    assert isinstance(snapshot, collections.abc.Mapping)
+    assert snapshot.namespace == 'snaptest'
+    assert snapshot['server']['port'] == '1'
+    assert snapshot['SERVER__HOST'] == 'h'
+    assert snapshot['timeout'] == 5
+    assert snapshot.mget('server__port', caster=int) == 1
+    assert snapshot.get('nope', 'x') == 'x'
+    assert snapshot.get_many(['timeout', 'nope']) == (5, None)
+    assert 'snaptest__server__host' in snapshot
+    with pytest.raises(KeyError):
+        snapshot['nope']
+    with pytest.raises(KeyError):
+        snapshot.mget_many(['timeout', 'nope'])
+    with pytest.raises(TypeError):
+        snapshot['server']['port'] = '2'
+    # snapshots never change, while new ones are published on reload
+    monkeypatch.setenv('SNAPTEST__SERVER__PORT', '2')
+    assert cfg['server__port'] == '2'
+    assert cfg.snapshot() is not snapshot
+    assert snapshot['server'] == {'port': '1', 'host': 'h'}
+    assert cfg.snapshot()['server'] == {'port': '2', 'host': 'h'}
+    assert cfg.snapshot() is cfg.snapshot()
+
+
+def test_values_are_not_shared_with_sources(tmpdir, monkeypatch):
+    dpath = str(tmpdir)
+    with open(os.path.join(dpath, 'cfg.json'), 'w') as cfile:
+        json.dump({'server': {'hosts': ['a']}}, cfile)
+    ports = [1, 2]
+    cfg = Birch('frozentest', directories=[dpath], auto_reload=True,
+                defaults={'ports': ports})
+    with pytest.raises(TypeError):
+        cfg['server']['hosts'].append('EVIL')
+    with pytest.raises(TypeError):
+        cfg['ports'].append(3)
+    ports.append(3)
+    monkeypatch.setenv('FROZENTEST__TIMEOUT', '5')
+    assert cfg['timeout'] == '5'
+    assert cfg['server']['hosts'] == ['a']
+    assert cfg['ports'] == [1, 2]
+    # modifiable copies don't reach next snapshots either
+    hosts = cfg['server']['hosts'].copy()
+    hosts.append('EVIL')
+    cfg.reload(sources='env')
+    assert cfg['server__hosts'] == ['a']
+
+
+def test_views_use_a_single_snapshot(monkeypatch):
+    monkeypatch.setenv('VIEWTEST__SERVER__PORT', '1')
+    monkeypatch.setenv('VIEWTEST__SERVER__HOST', 'h')
+    cfg = Birch('viewtest', directories=[], defaults={'timeout': '5'},
+                default_casters={'timeout': int}, auto_reload=True)
+    reload_if_changed = cfg._reload_if_changed = mock.Mock(
+        wraps=cfg._reload_if_changed)
+    expected = {'server__port': '1', 'server__host': 'h', 'timeout': 5}
+    assert dict(cfg.items()) == expected
+    assert sorted(cfg.keys()) == sorted(expected)
+    assert sorted(cfg.values(), key=str) == ['1', 5, 'h']
+    assert len(cfg.keys()) == len(cfg) == 3
+    assert 'server__port' in cfg.keys()
+    assert ('timeout', 5) in cfg.items()
+    assert 'h' in cfg.values()
+    assert 'server__port' in cfg
+    assert sorted(name for name, _ in cfg) == sorted(expected)
+    assert cfg == expected
+    # every operation reloads at most once, whatever the number of keys
+    assert reload_if_changed.call_count == 11
+    # views are bound to a single snapshot, even if reloaded while iterating
+    items = []
+    for key, value in cfg.items():
+        monkeypatch.setenv('VIEWTEST__SERVER__HOST', 'h2')
+        assert cfg['server__host'] == 'h2'
+        items.append((key, value))
+    assert dict(items) == expected
+    assert dict(cfg.items())['server__host'] == 'h2'
+
+
+def test_views_raise_on_failed_default_casts():
+    cfg = Birch('viewtest', directories=[], defaults={'timeout': 'x'},
+                default_casters={'timeout': int})
+    with pytest.raises(ValueError):
+        dict(cfg.items())
+    assert list(cfg.keys()) == ['timeout']
+
+
+def test_shared():
+    defaults = {'server': {'port': 1}}
+    cfg = Birch.shared(NSPACE4, directories=[], defaults=defaults)
+    assert Birch.shared(
+        NSPACE4, directories=(), defaults={'server': {'port': 1}}) is cfg
+    assert Birch.shared(NSPACE4, directories=[]) is not cfg
+    assert Birch.shared(NSPACE2, directories=[], defaults=defaults) is not cfg
+    assert cfg['server__port'] == 1
+    # instances are held only as long as they are referenced
+    cfg_ref = weakref.ref(cfg)
+    del cfg
+    gc.collect()
+    assert cfg_ref() is None
+    assert Birch.shared(NSPACE4, directories=[], defaults=defaults)
+
+
+def test_invalidate_shared():
+    cfg4 = Birch.shared(NSPACE4, directories=[])
+    cfg5 = Birch.shared(NSPACE2, directories=[])
+    Birch.invalidate_shared(NSPACE4)
+    assert Birch.shared(NSPACE4, directories=[]) is not cfg4
+    assert Birch.shared(NSPACE2, directories=[]) is cfg5
+    Birch.invalidate_shared()
+    assert Birch.shared(NSPACE2, directories=[]) is not cfg5
+    with pytest.raises(TypeError):
+        Birch.shared(NSPACE4, directories=[], defaults={'a': bytearray()})
+
+
+def test_shared_distinguishes_argument_types():
+    cfg = Birch.shared(NSPACE4, directories=[], auto_reload=True)
+    throttled_cfg = Birch.shared(NSPACE4, directories=[], auto_reload=1)
+    assert throttled_cfg is not cfg
+    assert isinstance(cfg._auto_reload, policies.OnAccessReload)
+    assert isinstance(throttled_cfg._auto_reload, policies.ThrottledReload)
+    assert Birch.shared(NSPACE4, directories=[], auto_reload=1.0) is not (
+        throttled_cfg)
+    lazy_cfg = Birch.shared(NSPACE4, directories=[], lazy=False)
+    assert Birch.shared(NSPACE4, directories=[], lazy=0) is not lazy_cfg
+    assert Birch.shared(
+        NSPACE4, directories=[], defaults={'a': 1}) is not Birch.shared(
+            NSPACE4, directories=[], defaults={'a': True})
+    for policy_cfg in (cfg, throttled_cfg):
+        policy_cfg.close()
+    with pytest.raises(ValueError, match='policy'):
+        Birch.shared(NSPACE4, directories=[],
+                     auto_reload=policies.OnAccessReload())
+
+
+def test_shared_construction_does_not_block():
+    release = threading.Event()
+    constructing = threading.Barrier(3)
+
+    class SlowBirch(Birch):
+        def __init__(self, namespace, **kwargs):
+            if namespace == 'slowtest':
+                constructing.wait(timeout=10)
+                release.wait(timeout=10)
+            super().__init__(namespace, **kwargs)
+
+    results = []
+
+    def get_shared():
+        results.append(SlowBirch.shared('slowtest', directories=[]))
+
+    threads = [threading.Thread(target=get_shared) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    # both threads are now constructing an object of the same arguments
+    constructing.wait(timeout=10)
+    # while objects of other arguments can be constructed meanwhile
+    assert SlowBirch.shared('fasttest', directories=[]) is not None
+    assert not release.is_set()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results[0] is results[1]
+    assert SlowBirch.shared('slowtest', directories=[]) is results[0]
+
+
 def test_xdg_cfg_dpath():
     cfg = Birch(NSPACE4)
     returned_dpath = cfg.xdg_cfg_dpath()
@@ -1,5 +1,7 @@
 """Testing default caster functionality for birch."""
 
+from unittest import mock
+
 import pytest
 
 from birch import Birch
@@ -42,3 +44,32 @@ def test_default_casters():
     val = cfg['shik']['shuk']
     assert isinstance(val, str)
     assert val == '8'
+
+
+def test_default_casters_type_errors():
+    cfg = Birch(
+        namespace=NSPACE4,
+        default_casters={
+            'shik': int,
+            'pik': 'not a callable',
+        },
+    )
+    assert cfg['shik']['shuk'] == '8'
+    assert cfg['pik'] == 'puk'
+
+
+def test_default_casters_applied_once_per_reload():
+    counting_int = mock.Mock(wraps=int)
+    cfg = Birch(
+        namespace=NSPACE4,
+        default_casters={'shik__shuk': counting_int},
+    )
+    assert counting_int.call_count == 1
+    for _ in range(5):
+        assert cfg['shik__shuk'] == 8
+        assert cfg.get('shik__shuk', caster=str) == '8'
+    assert counting_int.call_count == 1
+    cfg.reload()
+    assert counting_int.call_count == 2
+    assert cfg['shik__shuk'] == 8
+    assert counting_int.call_count == 2
@@ -0,0 +1,105 @@
+"""Testing configuration file deserializers for birch."""
+
+import os
+import sys
+import subprocess
+
+import json
+import math
+import pickle
+
+import yaml
+
+from birch import Birch
+import birch.deserializers
+from birch.deserializers import (
+    _deserializer,
+    _read_file_bytes,
+    json_backend,
+    register_deserializer,
+    use_fast_json,
+    yaml_loader,
+)
+
+
+def test_import_is_lazy():
+    repo_dpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys; import birch; "
+        "print([m for m in ('yaml', 'asyncio', 'ctypes') "
+        "if m in sys.modules])"
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], cwd=repo_dpath,
+        universal_newlines=True,
+    )
+    assert output.strip() == '[]'
+
+
+def test_deserializer():
+    assert _deserializer('.json') is _deserializer('.json')
+    assert _deserializer('.yml') is not None
+    assert _deserializer('.ini') is None
+
+
+def test_yaml_loader(monkeypatch):
+    if yaml.__with_libyaml__:
+        assert yaml_loader() is yaml.CSafeLoader
+    else:  # pragma: no cover
+        assert yaml_loader() is yaml.SafeLoader
+    monkeypatch.delattr(yaml, 'CSafeLoader', raising=False)
+    monkeypatch.setattr(birch.deserializers, '_EXT_TO_DESERIALIZER_MAP', {})
+    assert yaml_loader() is yaml.SafeLoader
+
+
+def test_json_backend(monkeypatch, tmpdir):
+    monkeypatch.setattr(birch.deserializers, '_EXT_TO_DESERIALIZER_MAP', {})
+    # fast JSON packages are never used by default, even if installed
+    assert json_backend() == 'json'
+    big = 123456789012345678901234567890
+    dpath = str(tmpdir)
+    with open(os.path.join(dpath, 'cfg.json'), 'w') as cfile:
+        cfile.write('{"big": %d, "nan": NaN}' % big)
+    cfg = Birch('birchjsontest', directories=[dpath])
+    assert cfg['big'] == big
+    assert type(cfg['big']) is int
+    assert math.isnan(cfg['nan'])
+
+
+def test_use_fast_json(monkeypatch):
+    monkeypatch.setattr(birch.deserializers, '_EXT_TO_DESERIALIZER_MAP', {})
+    monkeypatch.setattr(
+        birch.deserializers, 'JSON_BACKENDS', ['birchnosuchjson'])
+    assert use_fast_json() is None
+    assert json_backend() == 'json'
+    # any module providing a loads function accepting bytes will do
+    monkeypatch.setattr(
+        birch.deserializers, 'JSON_BACKENDS', ['birchnosuchjson', 'pickle'])
+    assert use_fast_json() == 'pickle'
+    assert _deserializer('.json')[0] is pickle.loads
+
+
+def test_register_deserializer(monkeypatch, tmpdir):
+    monkeypatch.setattr(birch.deserializers, '_EXT_TO_DESERIALIZER_MAP', {})
+    calls = []
+
+    def loads(data, **kwargs):
+        calls.append((type(data), kwargs))
+        return json.loads(data)
+
+    register_deserializer('.json', loads, flag=True)
+    assert json_backend() == __name__
+    dpath = str(tmpdir)
+    with open(os.path.join(dpath, 'cfg.json'), 'w') as cfile:
+        json.dump({'server': {'port': 55}}, cfile)
+    cfg = Birch('birchregtest', directories=[dpath])
+    assert cfg['server__port'] == 55
+    assert calls == [(bytes, {'flag': True})]
+
+
+def test_read_file_bytes(tmpdir):
+    fpath = os.path.join(str(tmpdir), 'cfg.json')
+    for data in [b'', b'{"a": 1}', bytes(range(256)) * 1024]:
+        with open(fpath, 'wb') as cfile:
+            cfile.write(data)
+        assert _read_file_bytes(fpath) == data
@@ -0,0 +1,58 @@
+"""Testing the process-wide environment variable index of birch."""
+
+import os
+from unittest import mock
+
+from birch import Birch
+from birch.env import _EnvIndex
+
+
+def _counting_index(monkeypatch):
+    index = _EnvIndex()
+    scan = mock.Mock(wraps=index._scan)
+    monkeypatch.setattr(index, '_scan', scan)
+    return index, scan
+
+
+def test_partition(monkeypatch):
+    index, scan = _counting_index(monkeypatch)
+    for prefix in ['ENVTEST_', 'ENVTEST_SUB_', 'OTHERENVTEST_']:
+        index.register(prefix)
+    monkeypatch.setenv('ENVTEST_HOST', 'a')
+    monkeypatch.setenv('ENVTEST_SUB_PORT', '1')
+    monkeypatch.setenv('XENVTEST_HOST', 'b')
+    assert index.partition('ENVTEST_') == {
+        ('ENVTEST_HOST', 'a'), ('ENVTEST_SUB_PORT', '1')}
+    assert index.partition('ENVTEST_SUB_') == {('ENVTEST_SUB_PORT', '1')}
+    assert index.partition('OTHERENVTEST_') == frozenset()
+    assert scan.call_count == 1
+
+
+def test_partition_rescans_on_change(monkeypatch):
+    index, scan = _counting_index(monkeypatch)
+    index.register('ENVTEST_')
+    monkeypatch.setenv('ENVTEST_HOST', 'a')
+    assert index.partition('ENVTEST_') == {('ENVTEST_HOST', 'a')}
+    assert index.partition('ENVTEST_') == {('ENVTEST_HOST', 'a')}
+    assert scan.call_count == 1
+    monkeypatch.setenv('ENVTEST_HOST', 'b')
+    assert index.partition('ENVTEST_') == {('ENVTEST_HOST', 'b')}
+    monkeypatch.delenv('ENVTEST_HOST')
+    assert index.partition('ENVTEST_') == frozenset()
+    assert scan.call_count == 3
+    # registering a prefix triggers a scan
+    index.register('OTHERENVTEST_')
+    assert index.partition('ENVTEST_') == frozenset()
+    assert scan.call_count == 4
+
+
+def test_namespaces_share_the_index(monkeypatch):
+    monkeypatch.setenv('ENVTEST_HOST', 'a')
+    monkeypatch.setenv('ENVTEST_APP__HOST', 'b')
+    cfg = Birch('envtest', directories=[], auto_reload=True)
+    sub_cfg = Birch('envtest_app', directories=[], auto_reload=True)
+    assert cfg['host'] == 'a'
+    assert sub_cfg['host'] == 'b'
+    os.environ['ENVTEST_APP__HOST'] = 'c'
+    assert sub_cfg['host'] == 'c'
+    assert cfg['app__host'] == 'c'
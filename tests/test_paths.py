@@ -0,0 +1,90 @@
+"""Testing path-related functions for birch."""
+
+import os
+import json
+import time
+from unittest import mock
+
+import birch.paths
+from birch import Birch
+from birch.paths import (
+    _dpath_fnames,
+    _fpath_fingerprint,
+    _fpath_fingerprints,
+)
+
+
+NSPACE = 'pathstest'
+
+
+def _write_cfg(fpath, val_dict):
+    with open(fpath, 'w') as cfile:
+        json.dump(val_dict, cfile)
+
+
+def _age_dpath(dpath):
+    # makes the directory's mtime old enough for its listing to be cached
+    old = time.time() - 60
+    os.utime(dpath, (old, old))
+
+
+def _count_scandir_calls(monkeypatch):
+    scandir = mock.Mock(wraps=os.scandir)
+    monkeypatch.setattr(birch.paths.os, 'scandir', scandir)
+    return scandir
+
+
+def test_dpath_fnames(monkeypatch, tmpdir):
+    scandir = _count_scandir_calls(monkeypatch)
+    dpath = str(tmpdir)
+    _write_cfg(os.path.join(dpath, 'cfg.json'), {})
+    _write_cfg(os.path.join(dpath, 'other.json'), {})
+    # recently modified directories are listed on every call
+    assert _dpath_fnames(dpath, 'cfg.') == {'cfg.json'}
+    assert _dpath_fnames(dpath, 'cfg.') == {'cfg.json'}
+    assert scandir.call_count == 2
+    _age_dpath(dpath)
+    assert _dpath_fnames(dpath, 'cfg.') == {'cfg.json'}
+    assert _dpath_fnames(dpath, 'cfg.') == {'cfg.json'}
+    assert scandir.call_count == 3
+    # adding an entry changes the directory's mtime
+    _write_cfg(os.path.join(dpath, 'cfg.yml'), {})
+    assert _dpath_fnames(dpath, 'cfg.') == {'cfg.json', 'cfg.yml'}
+    assert scandir.call_count == 4
+    assert _dpath_fnames(os.path.join(dpath, 'nosuchdir'), '') == set()
+
+
+def test_fpath_fingerprints(tmpdir):
+    dpath = str(tmpdir)
+    fpath = os.path.join(dpath, 'cfg.json')
+    _write_cfg(fpath, {})
+    _age_dpath(dpath)
+    missing_fpaths = [
+        os.path.join(dpath, 'cfg.yml'),
+        os.path.join(dpath, 'nosuchdir', 'cfg.json'),
+    ]
+    fingerprints = _fpath_fingerprints(
+        [fpath] + missing_fpaths, fname_prefix='cfg.')
+    assert fingerprints == {
+        fpath: _fpath_fingerprint(fpath),
+        missing_fpaths[0]: None,
+        missing_fpaths[1]: None,
+    }
+
+
+def test_reload_lists_each_directory_once(monkeypatch, tmpdir):
+    dpath = str(tmpdir)
+    _write_cfg(os.path.join(dpath, 'cfg.yml'), {'port': 1})
+    _age_dpath(dpath)
+    cfg = Birch(
+        NSPACE, directories=[dpath], supported_formats=['json', 'yaml'],
+        auto_reload=True,
+    )
+    assert cfg['port'] == 1
+    scandir = _count_scandir_calls(monkeypatch)
+    for _ in range(3):
+        assert cfg['port'] == 1
+    scandir.assert_not_called()
+    _write_cfg(os.path.join(dpath, 'cfg.json'), {'port': 2})
+    assert cfg['port'] == 2
+    scandir.assert_called_once_with(dpath)
@@ -0,0 +1,131 @@
+"""Testing automatic reload policies for birch."""
+
+import os
+import time
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from birch import Birch, policies
+from birch.policies import (
+    OnAccessReload,
+    ThrottledReload,
+    BackgroundReload,
+)
+
+
+NSPACE = 'policytest'
+ENVAR = NSPACE.upper() + '__PORT'
+
+
+def test_bad_auto_reload_values():
+    with pytest.raises(ValueError):
+        Birch(NSPACE, auto_reload='yes')
+    policy = OnAccessReload()
+    Birch(NSPACE, auto_reload=policy)
+    with pytest.raises(ValueError):
+        Birch(NSPACE, auto_reload=policy)
+
+
+def test_throttled_reload(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(policies.time, 'monotonic', lambda: now[0])
+    monkeypatch.setenv(ENVAR, '1')
+    # steps are exact in binary, so that no rounding is involved
+    cfg = Birch(NSPACE, auto_reload=0.25)
+    assert isinstance(cfg._auto_reload, ThrottledReload)
+    assert cfg['port'] == '1'
+    monkeypatch.setenv(ENVAR, '2')
+    now[0] += 0.125
+    assert cfg['port'] == '1'
+    now[0] += 0.125
+    assert cfg['port'] == '2'
+    monkeypatch.setenv(ENVAR, '3')
+    now[0] += 0.125
+    assert cfg['port'] == '2'
+    now[0] += 0.125
+    assert cfg['port'] == '3'
+    with pytest.raises(ValueError):
+        ThrottledReload()
+
+
+def test_throttled_reload_every_n_accesses():
+    os.environ[ENVAR] = '1'
+    cfg = Birch(NSPACE, auto_reload=ThrottledReload(interval=1000, every=3))
+    assert cfg['port'] == '1'
+    os.environ[ENVAR] = '2'
+    assert cfg['port'] == '1'
+    assert cfg['port'] == '2'
+    os.environ[ENVAR] = '3'
+    assert cfg['port'] == '2'
+    assert cfg['port'] == '2'
+    assert cfg['port'] == '3'
+    del os.environ[ENVAR]
+
+
+def test_throttled_reload_with_threads():
+    os.environ[ENVAR] = '1'
+    cfg = Birch(NSPACE, auto_reload=ThrottledReload(every=10))
+    reload_if_changed = cfg._reload_if_changed = mock.Mock(
+        wraps=cfg._reload_if_changed)
+
+    def access():
+        for _ in range(100):
+            assert cfg['port'] in ('1', '2')
+
+    threads = [threading.Thread(target=access) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    os.environ[ENVAR] = '2'
+    for thread in threads:
+        thread.join()
+    assert 0 < reload_if_changed.call_count <= 80
+    for _ in range(10):
+        cfg['port']
+    assert cfg['port'] == '2'
+    del os.environ[ENVAR]
+
+
+def test_background_reload(wait_for):
+    os.environ[ENVAR] = '1'
+    cfg = Birch(NSPACE, auto_reload=BackgroundReload(interval=0.05))
+    reloading_threads = []
+    publish = cfg._publish = mock.Mock(
+        wraps=cfg._publish,
+        side_effect=lambda fingerprints: reloading_threads.append(
+            threading.current_thread()) or mock.DEFAULT,
+    )
+    assert cfg['port'] == '1'
+    os.environ[ENVAR] = '2'
+    assert wait_for(lambda: cfg['port'] == '2')
+    assert publish.call_count == 1
+    assert reloading_threads[0] is not threading.current_thread()
+    cfg.close()
+    os.environ[ENVAR] = '3'
+    time.sleep(0.2)
+    assert cfg['port'] == '2'
+    del os.environ[ENVAR]
+
+
+def test_background_reload_in_event_loop():
+    os.environ[ENVAR] = '1'
+
+    async def check_reloading():
+        policy = BackgroundReload(interval=0.05)
+        cfg = Birch(NSPACE, auto_reload=policy)
+        assert policy._task is not None
+        assert cfg['port'] == '1'
+        os.environ[ENVAR] = '2'
+        for _ in range(200):
+            if cfg['port'] == '2':
+                break
+            await asyncio.sleep(0.02)
+        assert cfg['port'] == '2'
+        cfg.close()
+        await asyncio.sleep(0.01)
+        assert policy._task.cancelled()
+
+    asyncio.run(check_reloading())
+    del os.environ[ENVAR]
@@ -0,0 +1,152 @@
+"""Testing the compact storage of configuration values of birch."""
+
+import copy
+import pickle
+
+import pytest
+
+from birch.trie import (
+    _Node,
+    _ReadOnlyDict,
+    _ReadOnlyList,
+    _build_trie,
+    _get_path,
+    _count_leaves,
+    _freeze_values,
+)
+
+
+def test_build_trie_stores_values_once():
+    trie = _build_trie({'A__B': 1, 'a': {'C': 2, 'd__e': 3}})
+    assert trie == {'a': {'b': 1, 'c': 2, 'd': {'e': 3}}}
+    assert trie['A']['B'] == 1
+
+
+def test_nodes_accept_any_casing():
+    trie = _build_trie({'Server': {'Port': 1}, 4: 'four'})
+    assert all(type(node) is _Node for node in (trie, trie['server']))
+    assert dict.keys(trie['server']) == {'port'}
+    assert trie['SERVER']['port'] == 1
+    assert trie['server']['PoRt'] == 1
+    assert 'SERVER' in trie
+    assert 'server' in trie
+    assert 'host' not in trie
+    assert trie[4] == 'four'
+    assert 4 in trie
+    assert 5 not in trie
+    with pytest.raises(KeyError):
+        trie['server']['HOST']
+    with pytest.raises(KeyError):
+        trie['server'][5]
+
+
+def test_nodes_are_read_only():
+    trie = _build_trie({'a': {'b': 1}})
+    node = trie['a']
+    with pytest.raises(TypeError):
+        node['c'] = 2
+    with pytest.raises(TypeError):
+        del node['b']
+    with pytest.raises(TypeError):
+        node |= {'c': 2}
+    for method, args in [('clear', ()), ('pop', ('b',)), ('popitem', ()),
+                         ('setdefault', ('c', 2)), ('update', ({'c': 2},))]:
+        with pytest.raises(TypeError):
+            getattr(node, method)(*args)
+    assert trie == {'a': {'b': 1}}
+    modifiable = node.copy()
+    modifiable['c'] = 2
+    assert type(modifiable) is dict
+    assert node == {'b': 1}
+    for copied in (pickle.loads(pickle.dumps(trie)), copy.deepcopy(trie)):
+        assert copied == trie
+        assert type(copied['a']) is _Node
+        assert copied['A']['B'] == 1
+
+
+def test_container_values_are_frozen():
+    hosts = ['a', {'Name': 'b', 'ports': [1]}]
+    layer = {'hosts': hosts, 'tags': {'x'}, 'pair': (1, [2])}
+    trie = _build_trie(layer)
+    assert trie == {'hosts': hosts, 'tags': {'x'}, 'pair': (1, [2])}
+    assert type(trie['hosts']) is _ReadOnlyList
+    assert type(trie['hosts'][1]) is _ReadOnlyDict
+    assert type(trie['hosts'][1]['ports']) is _ReadOnlyList
+    assert type(trie['tags']) is frozenset
+    assert type(trie['pair'][1]) is _ReadOnlyList
+    # keys of dicts in lists are kept as they are
+    assert trie['hosts'][1]['Name'] == 'b'
+    with pytest.raises(TypeError):
+        trie['hosts'].append('c')
+    with pytest.raises(TypeError):
+        trie['hosts'] += ['c']
+    with pytest.raises(TypeError):
+        trie['hosts'][0] = 'c'
+    with pytest.raises(TypeError):
+        trie['hosts'][1]['name'] = 'c'
+    with pytest.raises(TypeError):
+        trie['hosts'][1]['ports'].sort()
+    # merged dicts are never referenced by tries, so they stay modifiable
+    hosts.append('c')
+    assert trie['hosts'] == ['a', {'Name': 'b', 'ports': [1]}]
+    modifiable = trie['hosts'].copy()
+    modifiable.append('c')
+    assert type(modifiable) is list
+    # frozen values are not copied again
+    assert _build_trie(trie)['hosts'] is trie['hosts']
+    for copied in (pickle.loads(pickle.dumps(trie)), copy.deepcopy(trie)):
+        assert copied == trie
+        assert type(copied['hosts']) is _ReadOnlyList
+        assert type(copied['hosts'][1]) is _ReadOnlyDict
+
+
+def test_freeze_values():
+    layer = {'a': {'b': [1, 2], 'c': [{'d': 1}], 'e': 'str'}, 'f': {1, 2}}
+    inner = layer['a']
+    assert _freeze_values(layer) is layer
+    assert layer['a'] is inner
+    assert layer == {'a': {'b': [1, 2], 'c': [{'d': 1}], 'e': 'str'},
+                     'f': {1, 2}}
+    assert type(layer['a']['b']) is _ReadOnlyList
+    assert type(layer['a']['c'][0]) is _ReadOnlyDict
+    assert type(layer['f']) is frozenset
+    # frozen layers are merged into tries without copying their values
+    assert _build_trie(layer)['a']['b'] is layer['a']['b']
+
+
+def test_build_trie_sep_keys_take_precedence():
+    assert _build_trie({'a__b': 1, 'a': {'b': 2}}) == {'a': {'b': 1}}
+    assert _build_trie({'a': {'b': 2}, 'a__b': 1}) == {'a': {'b': 1}}
+
+
+def test_build_trie_merges_deeply():
+    first = {'a': {'b': 1, 'c': {'d': 2}}, 'e': 3}
+    second = {'a': {'c': {'f': 4}}, 'e': {'g': 5}}
+    third = {'a__c': 6}
+    trie = _build_trie(first, second)
+    assert trie == {'a': {'b': 1, 'c': {'d': 2, 'f': 4}}, 'e': {'g': 5}}
+    assert _build_trie(first, second, third) == {'a': {'b': 1, 'c': 6},
+                                                 'e': {'g': 5}}
+    # merged dicts are never referenced by, or modified through, tries
+    assert first == {'a': {'b': 1, 'c': {'d': 2}}, 'e': 3}
+    assert trie['a'] is not first['a']
+    assert _build_trie(trie) is not trie
+
+
+def test_get_path():
+    trie = _build_trie({'a': {'b': 1, 'c': [1, 2]}, 'd': 'str'})
+    missing = object()
+    assert _get_path(trie, ('a', 'b'), missing) == 1
+    assert _get_path(trie, ('a',), missing) == {'b': 1, 'c': [1, 2]}
+    assert _get_path(trie, (), missing) is trie
+    assert _get_path(trie, ('a', 'x'), missing) is missing
+    assert _get_path(trie, ('a', 'c', 'x'), missing) is missing
+    assert _get_path(trie, ('d', 'x'), missing) is missing
+
+
+def test_count_leaves():
+    assert _count_leaves(_build_trie()) == 0
+    assert _count_leaves(_build_trie({'a': {}})) == 0
+    trie = _build_trie({'a__b': 1, 'a': {'c': [1, 2], 'd': {'e': None}}},
+                       {'f': 'str', 'a': {'d': 3}})
+    assert _count_leaves(trie) == 4
@@ -0,0 +1,137 @@
+"""Testing file watching functionality for birch."""
+
+import os
+import json
+import time
+
+import pytest
+
+from birch import Birch
+from birch.paths import _fpath_fingerprint
+from birch.watch import (
+    _PollingWatcher,
+    _InotifyWatcher,
+    _inotify_libc,
+)
+
+
+NSPACE = 'watchtest'
+
+
+def _write_cfg(fpath, val_dict):
+    # write to a temporary file and atomically replace the target file
+    tmp_fpath = fpath + '.tmp'
+    with open(tmp_fpath, 'w') as cfile:
+        json.dump(val_dict, cfile)
+    os.replace(tmp_fpath, fpath)
+
+
+def test_watch(tmp_path, wait_for):
+    dpath = str(tmp_path)
+    fpath = os.path.join(dpath, 'cfg.json')
+    _write_cfg(fpath, {'port': 1})
+    cfg = Birch(NSPACE, directories=[dpath], watch=True)
+    assert cfg['port'] == 1
+    _write_cfg(fpath, {'port': 2})
+    assert wait_for(lambda: cfg.get('port') == 2)
+    os.remove(fpath)
+    assert wait_for(lambda: cfg.get('port') is None)
+    cfg.close()
+    _write_cfg(fpath, {'port': 3})
+    time.sleep(2 * Birch._WATCH_INTERVAL)
+    assert cfg.get('port') is None
+    cfg.reload()
+    assert cfg['port'] == 3
+
+
+def test_lazy_watch(tmp_path):
+    dpath = str(tmp_path)
+    _write_cfg(os.path.join(dpath, 'cfg.json'), {'port': 1})
+    cfg = Birch(NSPACE, directories=[dpath], watch=True, lazy=True)
+    assert cfg._watcher is None
+    assert cfg['port'] == 1
+    assert cfg._watcher is not None
+    cfg.close()
+    assert cfg._watcher is None
+
+
+def test_lazy_watch_reload_before_access(tmp_path, wait_for):
+    dpath = str(tmp_path)
+    fpath = os.path.join(dpath, 'cfg.json')
+    _write_cfg(fpath, {'port': 1})
+    cfg = Birch(NSPACE, directories=[dpath], watch=True, lazy=True)
+    cfg.reload()
+    assert cfg._watcher is not None
+    assert cfg['port'] == 1
+    _write_cfg(fpath, {'port': 2})
+    assert wait_for(lambda: cfg.get('port') == 2)
+    cfg.close()
+
+
+def test_watch_follows_directories(tmp_path, wait_for):
+    dpath1 = str(tmp_path / 'a')
+    dpath2 = str(tmp_path / 'b')
+    os.makedirs(dpath1)
+    os.makedirs(dpath2)
+    _write_cfg(os.path.join(dpath1, 'cfg.json'), {'port': 1})
+    cfg = Birch(NSPACE, directories=[dpath1], watch=True)
+    assert cfg['port'] == 1
+    watcher = cfg._watcher
+    cfg.directories = [dpath2]
+    cfg.reload()
+    assert cfg._watcher is not watcher
+    assert watcher._stop_event.is_set()
+    assert cfg.get('port') is None
+    _write_cfg(os.path.join(dpath2, 'cfg.json'), {'port': 2})
+    assert wait_for(lambda: cfg.get('port') == 2)
+    # files in former directories are no longer watched
+    _write_cfg(os.path.join(dpath1, 'cfg.json'), {'port': 3})
+    time.sleep(2 * Birch._WATCH_INTERVAL)
+    assert cfg['port'] == 2
+    cfg.close()
+
+
+@pytest.mark.parametrize('watcher_cls', [_PollingWatcher, _InotifyWatcher])
+def test_watchers(tmp_path, watcher_cls, wait_for):
+    if watcher_cls is _InotifyWatcher:
+        libc = _inotify_libc()
+        if libc is None:  # pragma: no cover
+            pytest.skip("inotify is not available.")
+        kwargs = {'libc': libc}
+    else:
+        kwargs = {}
+    dpath = os.path.join(str(tmp_path), 'notyet')
+    fpath = os.path.join(dpath, 'cfg.json')
+    other_fpath = os.path.join(str(tmp_path), 'cfg.json')
+    changes = []
+
+    def callback(fpaths):
+        changes.append(fpaths)
+
+    watcher = watcher_cls(
+        fpaths=[fpath, other_fpath],
+        fingerprints={fpath: None, other_fpath: None},
+        callback=callback,
+        interval=0.05,
+        **kwargs
+    )
+    watcher.start()
+    try:
+        os.makedirs(dpath)
+        _write_cfg(fpath, {'a': 1})
+        assert wait_for(lambda: [fpath] in changes)
+        del changes[:]
+        with open(fpath, 'w') as cfile:
+            json.dump({'a': 22}, cfile)
+        assert wait_for(lambda: [fpath] in changes)
+        del changes[:]
+        os.remove(fpath)
+        os.rmdir(dpath)
+        assert wait_for(lambda: [fpath] in changes)
+        os.makedirs(dpath)
+        _write_cfg(fpath, {'a': 3})
+        assert wait_for(lambda: changes[-1] == [fpath])
+        assert _fpath_fingerprint(other_fpath) is None
+        assert all(other_fpath not in fpaths for fpaths in changes)
+    finally:
+        watcher.stop()